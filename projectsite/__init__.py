@@ -1,10 +1,17 @@
 import os
-from . import db
+
+# ASYNC_MODE=gevent has to patch the standard library before anything below
+# imports socket, ssl or threading, so it's read from the environment here
+if os.environ.get("ASYNC_MODE") == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
+from . import db, migrate, cache, serializers, metrics, hashing, tokens, stats, assets, compression
 from flask import Flask
+from . import views
 from .views import indexBp, blogBP
 from .api import apiBp
 from .auth import authBp
-from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -13,6 +20,61 @@ load_dotenv(env_path)
 
 def create_app(test_config=None):
     app = Flask(__name__)
+    app.config.from_mapping(
+        API_DEFAULT_PAGE_SIZE=100,
+        API_MAX_PAGE_SIZE=1000,
+        API_STREAM_CHUNK_SIZE=500,
+        API_BULK_CHUNK_SIZE=500,
+        API_BULK_MAX_ROWS=50000,
+        BLOG_PAGE_SIZE=50,
+        ASSETS_ENABLED=True,
+        ASSETS_MAX_AGE=31536000,
+        ASSETS_KEEP_BUILDS=3,
+        COMPRESS_ENABLED=True,
+        COMPRESS_MIN_SIZE=500,
+        COMPRESS_ALGORITHMS=("zstd", "br", "gzip"),
+        COMPRESS_GZIP_LEVEL=6,
+        COMPRESS_BR_LEVEL=4,
+        COMPRESS_ZSTD_LEVEL=3,
+        # static files are sent as passthrough and never compressed here, see
+        # assets.py for their precompressed variants
+        COMPRESS_MIMETYPES=("application/json", "application/x-ndjson", "application/xml", "text/html", "text/plain"),
+        MYSQL_PORT=3306,
+        MYSQL_DRIVER=os.environ.get("MYSQL_DRIVER"),
+        ASYNC_MODE=os.environ.get("ASYNC_MODE", "off"),
+        ASYNC_MAX_CONNECTIONS=int(os.environ.get("ASYNC_MAX_CONNECTIONS", 1000)),
+        MYSQL_CHARSET="utf8mb4",
+        MYSQL_CONNECT_TIMEOUT=10,
+        MYSQL_POOL_MIN_SIZE=1,
+        MYSQL_POOL_MAX_SIZE=10,
+        MYSQL_POOL_MAX_LIFETIME=3600,
+        MYSQL_POOL_IDLE_TIMEOUT=300,
+        MYSQL_POOL_TIMEOUT=10,
+        MYSQL_POOL_PING_INTERVAL=30,
+        MYSQL_REPLICAS=os.environ.get("MYSQL_REPLICAS", ""),
+        MYSQL_REPLICA_MAX_LAG=5,
+        MYSQL_REPLICA_CHECK_INTERVAL=5,
+        MYSQL_STICKY_SECONDS=5,
+        CACHE_ENABLED=True,
+        CACHE_TTL=60,
+        CACHE_MAX_ENTRIES=1024,
+        CACHE_REDIS_URL=os.environ.get("CACHE_REDIS_URL"),
+        JSON_PROVIDER=os.environ.get("JSON_PROVIDER", "auto"),
+        METRICS_ENABLED=True,
+        METRICS_SAMPLE_RATE=0.1,
+        METRICS_SERVER_TIMING=False,
+        PASSWORD_HASH_METHOD=os.environ.get("PASSWORD_HASH_METHOD", "scrypt"),
+        PASSWORD_HASH_SALT_LENGTH=16,
+        PASSWORD_HASH_WORKERS=int(os.environ.get("PASSWORD_HASH_WORKERS", 2)),
+        PASSWORD_HASH_QUEUE_SIZE=32,
+        PASSWORD_HASH_TIMEOUT=10,
+        GRADE_STATS_SUMMARY=False,
+        JWT_CACHE_ENABLED=True,
+        JWT_CACHE_MAX_ENTRIES=4096,
+        JWT_CACHE_TTL=300,
+        JWT_BLOCKLIST_REDIS_URL=os.environ.get("JWT_BLOCKLIST_REDIS_URL", os.environ.get("CACHE_REDIS_URL")),
+    )
+
     if test_config is None:
         app.config.from_mapping(
             SECRET_KEY=os.environ.get("SECRET_KEY", "dev"),
@@ -27,13 +89,22 @@ def create_app(test_config=None):
     else:
         app.config.from_mapping(test_config)
     
+    serializers.init_app(app)
     db.init_app(app)
-    JWTManager(app)
+    migrate.init_app(app)
+    cache.init_app(app)
+    metrics.init_app(app)
+    hashing.init_app(app)
+    tokens.init_app(app)
+    stats.init_app(app)
+    assets.init_app(app)
+    compression.init_app(app)
 
 
     app.register_blueprint(indexBp)
     app.register_blueprint(blogBP)
     app.register_blueprint(apiBp)
     app.register_blueprint(authBp)
+    views.init_app(app)
 
     return app
\ No newline at end of file
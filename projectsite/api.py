@@ -1,192 +1,472 @@
-from .db import get_db
-from flask import Blueprint,jsonify, request, make_response
-import dicttoxml
+import base64
+import json
+import re
+from functools import partial
+from .db import get_db, get_streaming_cursor, pool_stats
+from .cache import cached, cache_stats, invalidate
+from .serializers import xml_encoder, XML_HEADER
+from .stats import get_group_by, get_buckets, grade_stats
+from .replicas import replica_stats
+from .resources import RESOURCES, select_sql, row_sql, insert_sql, insert_rows_sql, update_sql, delete_sql, ids_sql, sql_cache_info
+from flask import Blueprint,jsonify, request, make_response, current_app, url_for, stream_with_context
 from flask_jwt_extended import jwt_required
 
 apiBp = Blueprint('api', __name__, url_prefix = '/api')
 
 #helper functions
 
-def format_response(data, status_code=200):
+def format_response(data, status_code=200, headers=None):
     format_type = request.args.get('format', 'json').lower()
 
     if format_type == 'xml':
-        xml = dicttoxml.dicttoxml(data, custom_root='response', attr_type=False)
+        xml = xml_encoder.encode(data)
         response = make_response(xml, status_code)
         response.headers['Content-Type'] = 'application/xml'
-        return response
     else:
-        return jsonify(data), status_code
+        response = make_response(jsonify(data), status_code)
 
-# ------------- API ENDPOINTS ---------------
-# students endpoint
-
-@apiBp.route('/students', methods=['GET'])
-def get_students_data():
-    try:
-        conn = get_db()
-
-        search_filters = {
-            'student_name': 'LIKE',
-            'course': 'LIKE',
-            'year_level': '=',
-            'email': 'LIKE'
-        }
-
-        query = 'SELECT * FROM students WHERE 1=1'
-        params = []
-
-        for fields, operator in search_filters.items():
-            value = request.args.get(fields)
-            if value:
-                if operator == 'LIKE':
-                    query += f' AND {fields} LIKE %s'
-                    params.append(f'%{value}%')
-                else:
-                    query += f' AND {fields} = %s'
-                    params.append(value)
+    if headers:
+        response.headers.update(headers)
+    return response
 
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            students = cur.fetchall()
-
-        return format_response(students)
-    
-    except Exception as e:
-        return format_response(
-            {
-                'success': False,
-                'error': str(e)
-            }
-        , 500)
+# pagination helpers
+# list endpoints page on the primary key (keyset pagination) so every page
+# costs one index range scan no matter how deep the client goes
 
-@apiBp.route('/student/<int:student_id>', methods=['GET'])
-def get_student_data(student_id):
+def encode_cursor(last_id):
+    token = base64.urlsafe_b64encode(f'id:{last_id}'.encode())
+    return token.decode().rstrip('=')
 
+def decode_cursor(token):
     try:
-        conn = get_db()
-        with conn.cursor() as cur:
-            cur.execute('SELECT * FROM students WHERE id = %s', (student_id,))
-            student = cur.fetchone()
-        
-        if not student:
-            return format_response(
-                {
-                    'success': False,
-                    'error': 'student not found'
-                }
-            , 404)
-        
-        return format_response(student)
-    
-    except Exception as e:
-        return format_response(
-            {
-                'success': False,
-                'error': str(e)
-            }
-        , 500)
-
-@apiBp.route('/students', methods=['POST'])
-@jwt_required()
-def create_students():
+        padded = token + '=' * (-len(token) % 4)
+        prefix, _, value = base64.urlsafe_b64decode(padded).decode().partition(':')
+        if prefix != 'id':
+            raise ValueError
+        return int(value)
+    except ValueError:
+        raise ValueError('invalid cursor')
+
+def get_page_args():
+    default_size = current_app.config['API_DEFAULT_PAGE_SIZE']
+    max_size = current_app.config['API_MAX_PAGE_SIZE']
 
     try:
-        data = request.get_json()
-        required_fields = ['student_name', 'course', 'year_level', 'email']
-        conn = get_db()
+        limit = int(request.args.get('limit', default_size))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+
+    after = request.args.get('after')
+    after = decode_cursor(after) if after else None
+
+    return after, min(limit, max_size)
+
+def paginate(cur, query, params, limit):
+    # query ends in LIMIT %s, fetch one extra row to know whether there is a next page
+    params.append(limit + 1)
+
+    cur.execute(query, params)
+    rows = list(cur.fetchall())
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['id'])
+        # path arguments too, e.g. /student/<student_id>/grades
+        args = {**request.view_args, **request.args.to_dict()}
+        args.update(after=next_cursor, limit=limit)
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+
+    return rows, headers
+
+# projection helpers
+# ?fields=a,b selects only those columns; id is always included because
+# the pagination cursor is built from it
+
+def get_projection(columns):
+    fields = request.args.get('fields')
+    if not fields:
+        return columns
+
+    requested = {field.strip() for field in fields.split(',') if field.strip()}
+    unknown = requested.difference(columns)
+    if unknown:
+        raise ValueError(f'unknown fields: {", ".join(sorted(unknown))}')
+
+    return tuple(column for column in columns if column == 'id' or column in requested)
+
+# search helpers
+# ?match= picks how the text filters are matched:
+#   contains  LIKE '%value%', the default, always a full scan
+#   prefix    LIKE 'value%', served by the B-tree indexes
+#   fulltext  MATCH ... AGAINST on the FULLTEXT indexes (whole words and word prefixes)
+# the indexes are created by migrations 0001 and 0002
+
+MATCH_MODES = ('contains', 'prefix', 'fulltext')
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def fulltext_query(value):
+    # every word must be present, each one matched as a word prefix
+    return ' '.join(f'+{word}*' for word in re.findall(r'\w+', value))
+
+def build_filters(search_filters):
+    # returns the (column, operator) conditions and their values
+    match = request.args.get('match', 'contains').lower()
+    if match not in MATCH_MODES:
+        raise ValueError(f'match must be one of: {", ".join(MATCH_MODES)}')
+
+    conditions = []
+    params = []
+
+    for field, operator in search_filters.items():
+        value = request.args.get(field)
+        if not value:
+            continue
+
+        if operator != 'LIKE':
+            conditions.append((field, '='))
+            params.append(value)
+        elif match == 'fulltext':
+            conditions.append((field, 'MATCH'))
+            params.append(fulltext_query(value))
+        elif match == 'prefix':
+            conditions.append((field, 'LIKE'))
+            params.append(f'{escape_like(value)}%')
+        else:
+            conditions.append((field, 'LIKE'))
+            params.append(f'%{escape_like(value)}%')
+
+    return conditions, params
+
+# streaming helpers
+# ?stream=true (or format=ndjson) sends the rows as they come off an
+# unbuffered cursor instead of building the whole payload in memory
+
+STREAM_CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'xml': 'application/xml',
+}
+
+def wants_stream():
+    format_type = request.args.get('format', 'json').lower()
+    stream = request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+    return format_type == 'ndjson' or stream
 
+def encode_rows(rows, format_type, first):
+    if format_type == 'xml':
+        return xml_encoder.encode_rows(rows)
 
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return format_response(
-                    {
-                        'success': False,
-                        'error': f'missing required field: {field}'
-                    }
-                , 400)
-            
-        if '@' not in data['email']:
-            return format_response(
-                {
-                    'success': False,
-                    'error': 'invalid email formats'
-                }
-            , 400)
-        
-        with conn.cursor() as cur:
-            cur.execute('INSERT INTO students (student_name, course, year_level, email) VALUES (%s, %s, %s, %s)',
-            (data['student_name'], data['course'], data['year_level'], data['email']))
+    dumps = current_app.json.dumps
+    chunk = []
 
-            conn.commit()
-            new_id = cur.lastrowid
+    for row in rows:
+        if format_type == 'ndjson':
+            chunk.append(dumps(row))
+            chunk.append('\n')
+        else:
+            if not first:
+                chunk.append(',')
+            chunk.append(dumps(row))
+        first = False
 
-        return format_response(
-            {
-                'success': True,
-                'message': f'student {new_id} created successfully'
-            }, 201)
+    return ''.join(chunk)
 
-    except Exception as e:
-        return format_response(
-            {
-                'success': False,
-                'error': str(e)
-            }    
-        , 500)
+def stream_response(conn, query, params):
+    format_type = request.args.get('format', 'json').lower()
+    if format_type not in STREAM_CONTENT_TYPES:
+        format_type = 'json'
 
-@apiBp.route('/student/<int:student_id>', methods=['PUT'])
-@jwt_required()
-def update_student(student_id):
+    # run the query before the response starts so errors still get a status code
+    cur = get_streaming_cursor(conn)
     try:
+        cur.execute(query, params)
+    except Exception:
+        cur.close()
+        raise
+
+    chunk_size = current_app.config['API_STREAM_CHUNK_SIZE']
+
+    def generate():
+        try:
+            if format_type == 'xml':
+                yield f'{XML_HEADER}<response>'
+            elif format_type == 'json':
+                yield '['
+
+            first = True
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield encode_rows(rows, format_type, first)
+                first = False
+
+            if format_type == 'xml':
+                yield '</response>'
+            elif format_type == 'json':
+                yield ']'
+        finally:
+            cur.close()
+
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype=STREAM_CONTENT_TYPES[format_type]
+    )
+
+# write responses
+# PUT answers with just a message unless the client sends
+# "Prefer: return=representation", then the updated row is read back inside
+# the same transaction (MySQL has no UPDATE ... RETURNING)
+
+def wants_representation():
+    return 'return=representation' in request.headers.get('Prefer', '')
+
+def fetch_representation(cur, resource, row_id):
+    if not wants_representation():
+        return None
+    cur.execute(row_sql(resource.table, resource.columns), (row_id,))
+    return cur.fetchone()
+
+def updated_response(message, representation=None):
+    body = {
+        'success': True,
+        'message': message
+    }
+    if representation is None:
+        return format_response(body)
+
+    body['data'] = representation
+    return format_response(body, headers={'Preference-Applied': 'return=representation'})
+
+# write hooks, see resources.WriteHook
+
+def before_write(resource, cur, action, ids):
+    return [hook.before(cur, action, ids) for hook in resource.hooks]
+
+def after_write(resource, cur, action, ids, states):
+    for hook, state in zip(resource.hooks, states):
+        hook.after(cur, action, ids, state)
+
+# bulk helpers
+# bulk endpoints take a JSON array (or NDJSON with Content-Type
+# application/x-ndjson), validate every row up front and write them in
+# chunks of API_BULK_CHUNK_SIZE inside a single transaction
+
+def get_bulk_rows():
+    if request.mimetype == 'application/x-ndjson':
+        try:
+            lines = request.get_data(as_text=True).splitlines()
+            rows = [json.loads(line) for line in lines if line.strip()]
+        except ValueError:
+            raise ValueError('invalid NDJSON body')
+    else:
+        rows = request.get_json(silent=True)
+
+    if not isinstance(rows, list):
+        raise ValueError('expected a JSON array of rows')
+    if not rows:
+        raise ValueError('no rows given')
+
+    max_rows = current_app.config['API_BULK_MAX_ROWS']
+    if len(rows) > max_rows:
+        raise ValueError(f'too many rows, the limit is {max_rows}')
+
+    return rows
+
+def chunked(items):
+    size = current_app.config['API_BULK_CHUNK_SIZE']
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def get_row_id(row):
+    value = row.get('id') if isinstance(row, dict) else row
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value
+
+def existing_ids(cur, table, ids):
+    cur.execute(ids_sql('SELECT', table, len(ids)), ids)
+    return {row['id'] for row in cur.fetchall()}
+
+def row_result(index, error=None, row_id=None):
+    if error:
+        return {'index': index, 'success': False, 'error': error}
+    return {'index': index, 'success': True, 'id': row_id}
+
+def bulk_response(results, message, status_code=200):
+    failed = [result for result in results if not result['success']]
+
+    return format_response(
+        {
+            'success': not failed,
+            'message': message,
+            'results': results
+        }
+    , status_code)
+
+def bulk_validation_error(results):
+    return format_response(
+        {
+            'success': False,
+            'error': 'validation failed, nothing was written',
+            'results': [result for result in results if not result['success']]
+        }
+    , 400)
 
-        data = request.get_json()
+def auto_increment_step(cur):
+    # ids of one INSERT are auto_increment_increment apart, more than 1 on
+    # Galera and other multi-primary setups
+    cur.execute('SELECT @@SESSION.auto_increment_increment AS step')
+    return int(cur.fetchone()['step'])
 
-        ALLOWED_FIELDS = ("student_name", "course", "year_level", "email")
-        update_fields, params = [], []
+def bulk_create(resource):
+    rows = get_bulk_rows()
+    table, columns = resource.table, resource.required
+    results = []
 
-        conn = get_db()
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results.append(row_result(index, 'row must be an object'))
+        else:
+            results.append(row_result(index, resource.validate_create(row)))
 
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM students WHERE id = %s", (student_id,))
-            student = cur.fetchone()
+    if not all(result['success'] for result in results):
+        return bulk_validation_error(results)
 
-            if not student:
-                return format_response(
-                    {
-                        'success': False,
-                        'error': 'student not found'
-                    }
-                , 404)
+    conn = get_db()
 
-            for field in ALLOWED_FIELDS:
-                if field in data:
-                    if field == 'email' and '@' not in data[field]:
-                        return format_response({
-                            'success': False,
-                            'error': 'Invalid email format'
-                        }, 400)
-                    
-                    update_fields.append(f"{field} = %s")
-                    params.append(data[field])
-            
-            if not update_fields:
-                return format_response({
-                    'success': False,
-                    'error': 'No fields to update'
-                }, 400)
+    try:
+        with conn.cursor() as cur:
+            step = auto_increment_step(cur)
+            index = 0
+            for chunk in chunked(rows):
+                states = before_write(resource, cur, 'create', [])
+                # one multi-row INSERT per chunk. For an INSERT ... VALUES the
+                # row count is known up front and InnoDB reserves all of its
+                # ids at once, step apart, in every innodb_autoinc_lock_mode
+                # (interleaving with lock mode 2 only concerns INSERT ...
+                # SELECT and the like); lastrowid is the first of them.
+                # executemany would split the chunk into several statements
+                # past the driver's max_stmt_length, and lastrowid would then
+                # only be the first id of the last one
+                cur.execute(insert_rows_sql(table, columns, len(chunk)),
+                            [row[column] for row in chunk for column in columns])
+                ids = [cur.lastrowid + offset * step for offset in range(len(chunk))]
+                for row_id in ids:
+                    results[index] = row_result(index, row_id=row_id)
+                    index += 1
+                after_write(resource, cur, 'create', ids, states)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    invalidate(*resource.invalidates)
+    return bulk_response(results, f'{len(rows)} {table} created successfully', 201)
+
+def bulk_update(resource):
+    rows = get_bulk_rows()
+    table, allowed_fields = resource.table, resource.updatable
+    results = []
+
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict) or get_row_id(row) is None:
+            error = 'row must be an object with an integer id'
+        else:
+            error = resource.validate_update(row)
+        results.append(row_result(index, error))
+
+    if not all(result['success'] for result in results):
+        return bulk_validation_error(results)
+
+    conn = get_db()
 
-            params.append(student_id)
-            cur.execute(f"UPDATE students SET {', '.join(update_fields)} WHERE id = %s", params)
-            conn.commit()
+    try:
+        with conn.cursor() as cur:
+            for chunk in chunked(list(enumerate(rows))):
+                found = existing_ids(cur, table, [row['id'] for _, row in chunk])
+
+                # rows that set the same columns share one statement
+                shapes = {}
+                for index, row in chunk:
+                    if row['id'] not in found:
+                        results[index] = row_result(index, f'{resource.singular} {row["id"]} not found')
+                        continue
+
+                    fields = tuple(field for field in allowed_fields if field in row)
+                    params = tuple(row[field] for field in fields) + (row['id'],)
+                    shapes.setdefault(fields, []).append(params)
+                    results[index] = row_result(index, row_id=row['id'])
+
+                ids = [row['id'] for _, row in chunk if row['id'] in found]
+                states = before_write(resource, cur, 'update', ids)
+                for fields, params in shapes.items():
+                    cur.executemany(update_sql(table, fields), params)
+                after_write(resource, cur, 'update', ids, states)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    invalidate(*resource.invalidates)
+    updated = sum(result['success'] for result in results)
+    return bulk_response(results, f'{updated} {table} updated successfully')
+
+def bulk_delete(resource):
+    rows = get_bulk_rows()
+    table = resource.table
+    ids = [get_row_id(row) for row in rows]
+    results = [
+        row_result(index, None if row_id is not None else 'expected an integer id')
+        for index, row_id in enumerate(ids)
+    ]
+
+    if not all(result['success'] for result in results):
+        return bulk_validation_error(results)
+
+    conn = get_db()
 
+    try:
+        with conn.cursor() as cur:
+            for chunk in chunked(list(enumerate(ids))):
+                found = existing_ids(cur, table, [row_id for _, row_id in chunk])
+
+                for index, row_id in chunk:
+                    if row_id in found:
+                        results[index] = row_result(index, row_id=row_id)
+                    else:
+                        results[index] = row_result(index, f'{resource.singular} {row_id} doesn\'t exist')
+
+                if found:
+                    states = before_write(resource, cur, 'delete', list(found))
+                    cur.execute(ids_sql('DELETE', table, len(found)), list(found))
+                    after_write(resource, cur, 'delete', list(found), states)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    invalidate(*resource.invalidates)
+    deleted = sum(result['success'] for result in results)
+    return bulk_response(results, f'{deleted} {table} deleted successfully')
+
+def run_bulk(operation, *args, **kwargs):
+    try:
+        return operation(*args, **kwargs)
+    except ValueError as e:
         return format_response(
             {
-                'success': True,
-                'message': f'student {student_id} updated successfully'
+                'success': False,
+                'error': str(e)
             }
-        )
-            
+        , 400)
     except Exception as e:
         return format_response(
             {
@@ -194,334 +474,211 @@ def update_student(student_id):
                 'error': str(e)
             }
         , 500)
-    
-@apiBp.route('/student/<int:student_id>', methods=['DELETE'])
-@jwt_required()
-def delete_student(student_id):
-    try:
-        conn = get_db()
 
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM students WHERE id = %s", (student_id,))
-            student = cur.fetchone()
-
-            if not student:
-                return format_response(
-                    {
-                        'success': False,
-                        'error': f'student {student_id} doesn\'t exist'
-                    }
-                , 404)
-            
-            cur.execute("DELETE FROM students WHERE id = %s", (student_id,))
-            conn.commit()
+# ------------- API ENDPOINTS ---------------
+# runtime stats
+
+@apiBp.route('/stats', methods=['GET'])
+def get_stats():
+    return format_response(
+        {
+            'pool': pool_stats(),
+            'replicas': replica_stats(),
+            'cache': cache_stats(),
+            'sql': sql_cache_info()
+        }
+    )
 
-        return format_response(
-            {
-                'success': True,
-                'message': f'student {student_id} deleted successfully'
-            }
-        )
+# grade statistics
 
-    except Exception as e:
+@apiBp.route('/grades/stats', methods=['GET'])
+@cached('grades')
+def get_grades_stats():
+    try:
+        group_by = get_group_by(request.args.get('group_by'))
+        edges = get_buckets(request.args.get('buckets'))
+        conditions, params = build_filters(RESOURCES['grades'].filters)
+    except ValueError as e:
         return format_response(
             {
                 'success': False,
                 'error': str(e)
             }
-        , 500)
-
-# teachers endpoints
+        , 400)
 
-@apiBp.route('/teachers', methods=['GET'])
-def get_teachers_data():
     try:
         conn = get_db()
-
-        search_filters = {
-            'teacher_name': 'LIKE',
-            'department': 'LIKE',
-            'email': 'LIKE'
-        }
-
-        query = 'SELECT * FROM teachers WHERE 1=1'
-        params = []
-
-        for fields in search_filters:
-            value = request.args.get(fields)
-            if value:
-                query += f' AND {fields} LIKE %s'
-                params.append(f'%{value}%')
-
         with conn.cursor() as cur:
-            cur.execute(query, params)
-            teachers = cur.fetchall()
+            rows = grade_stats(cur, group_by, conditions, params, edges)
+
+        return format_response(rows)
 
-        return format_response(teachers)
-    
     except Exception as e:
         return format_response(
             {
                 'success': False,
                 'error': str(e)
-            }, 500)
-    
-@apiBp.route('/teacher/<int:teacher_id>', methods=['GET'])
-def get_teacher_data(teacher_id):
+            }
+        , 500)
+
+# a student's grades, served by the (student_id, semester) index
+
+@apiBp.route('/student/<int:student_id>/grades', methods=['GET'])
+@cached('grades', 'students')
+def get_student_grades(student_id):
+    grades = RESOURCES['grades']
+
     try:
-        conn = get_db()
-        with conn.cursor() as cur:
-            cur.execute('SELECT * FROM teachers WHERE id = %s', (teacher_id,))
-            teacher = cur.fetchone()
-        
-        if not teacher:
-            return format_response(
-                {
-                    'success': False,
-                    'error': 'teacher not found'
-                }
-            , 404)
-        
-        return format_response(teacher)
-    
-    except Exception as e:
+        after, limit = get_page_args()
+        projection = get_projection(grades.columns)
+    except ValueError as e:
         return format_response(
             {
                 'success': False,
                 'error': str(e)
-            }, 500)
+            }
+        , 400)
+
+    conditions, params = [('student_id', '=')], [student_id]
+    if request.args.get('semester'):
+        conditions.append(('semester', '='))
+        params.append(request.args['semester'])
+    if after is not None:
+        conditions.append(('id', '>'))
+        params.append(after)
 
-@apiBp.route('/teachers', methods=['POST'])
-@jwt_required()
-def create_teachers():
     try:
-        data = request.get_json()
-        required_fields = ['teacher_name', 'department', 'email']
         conn = get_db()
-
-
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return format_response(
-                    {
-                        'success': False,
-                        'error': f'missing required field: {field}'
-                    }, 400)
-            
-        if '@' not in data['email']:
-            return format_response(
-                {
-                    'success': False,
-                    'error': 'invalid email formats'
-                }, 400)
-        
         with conn.cursor() as cur:
-            cur.execute('INSERT INTO teachers (teacher_name, department, email) VALUES (%s, %s, %s)',
-            (data['teacher_name'], data['department'], data['email']))
-
-            conn.commit()
-            new_id = cur.lastrowid
+            query = select_sql(grades.table, projection, tuple(conditions), limited=True)
+            rows, headers = paginate(cur, query, params, limit)
+
+            # an empty page may just mean there's no such student
+            if not rows and after is None:
+                cur.execute(row_sql('students', ('id',)), (student_id,))
+                if cur.fetchone() is None:
+                    return format_response(
+                        {
+                            'success': False,
+                            'error': 'student not found'
+                        }
+                    , 404)
 
-        return format_response(
-            {
-                'success': True,
-                'message': f'teacher {new_id} created successfully'
-            }, 201)
+        return format_response(rows, headers=headers)
 
     except Exception as e:
         return format_response(
             {
                 'success': False,
                 'error': str(e)
-            }, 500)
-
-@apiBp.route('/teacher/<int:teacher_id>', methods=['PUT'])
-@jwt_required()
-def update_teacher(teacher_id):
-    try:
-
-        data = request.get_json()
-
-        ALLOWED_FIELDS = ("teacher_name", "department", "email")
-        update_fields, params = [], []
-
-        conn = get_db()
-
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM teachers WHERE id = %s", (teacher_id,))
-            teacher = cur.fetchone()
-
-            if not teacher:
-                return format_response(
-                    {
-                        'success': False,
-                        'error': 'teacher not found'
-                    }
-                , 404)
-
-            for field in ALLOWED_FIELDS:
-                if field in data:
-                    if field == 'email' and '@' not in data[field]:
-                        return format_response({
-                            'success': False,
-                            'error': 'Invalid email format'
-                        }, 400)
-                    
-                    update_fields.append(f"{field} = %s")
-                    params.append(data[field])
-            
-            if not update_fields:
-                return format_response({
-                    'success': False,
-                    'error': 'No fields to update'
-                }, 400)
+            }
+        , 500)
 
-            params.append(teacher_id)
-            cur.execute(f"UPDATE teachers SET {', '.join(update_fields)} WHERE id = %s", params)
-            conn.commit()
+# resource endpoints
+# one set of handlers serves every table in resources.RESOURCES, see
+# add_resource_routes at the bottom for the URLs and endpoint names
 
-        return format_response(
-            {
-                'success': True,
-                'message': f'teacher {teacher_id} updated successfully'
-            }
-        )
-            
-    except Exception as e:
+def list_rows(resource):
+    try:
+        after, limit = get_page_args()
+        conditions, params = build_filters(resource.filters)
+        projection = get_projection(resource.columns)
+    except ValueError as e:
         return format_response(
             {
                 'success': False,
                 'error': str(e)
-            }, 500)
+            }
+        , 400)
+
+    if after is not None:
+        conditions.append(('id', '>'))
+        params.append(after)
 
-@apiBp.route('/teacher/<int:teacher_id>', methods=['DELETE'])
-@jwt_required()
-def delete_teacher(teacher_id):
     try:
         conn = get_db()
 
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM teachers WHERE id = %s", (teacher_id,))
-            teacher = cur.fetchone()
+        if wants_stream():
+            query = select_sql(resource.table, projection, tuple(conditions))
+            return stream_response(conn, query, params)
 
-            if not teacher:
-                return format_response(
-                    {
-                        'success': False,
-                        'error': f'teacher {teacher_id} doesn\'t exist'
-                    }
-                , 404)
-            
-            cur.execute("DELETE FROM teachers WHERE id = %s", (teacher_id,))
-            conn.commit()
+        query = select_sql(resource.table, projection, tuple(conditions), limited=True)
+        with conn.cursor() as cur:
+            rows, headers = paginate(cur, query, params, limit)
 
-        return format_response(
-            {
-                'success': True,
-                'message': f'teacher {teacher_id} deleted successfully'
-            }
-        )
+        return format_response(rows, headers=headers)
 
     except Exception as e:
         return format_response(
             {
                 'success': False,
                 'error': str(e)
-            }, 500)
-
-# grades endpoints
+            }
+        , 500)
 
-@apiBp.route('/grades', methods=['GET'])
-def get_grades_data():
+def get_row(resource, row_id):
     try:
-        conn = get_db()
-
-        search_filters = {
-            'student_name': 'LIKE',
-            'course_name': 'LIKE',
-            'grade': '=',
-            'semester': 'LIKE'
-        }
-
-        query = 'SELECT * FROM grades WHERE 1=1'
-        params = []
-
-        for fields, operators in search_filters.items():
-            value = request.args.get(fields)
-            if value:
-                if operators == 'LIKE':
-                    query += f' AND {fields} LIKE %s'
-                    params.append(f'%{value}%')
-                else:
-                    query += f' AND {fields} = %s'
-                    params.append(value)
-
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            grades = cur.fetchall()
-
-        return format_response(grades)
-    
-    except Exception as e:
+        projection = get_projection(resource.columns)
+    except ValueError as e:
         return format_response(
             {
                 'success': False,
                 'error': str(e)
-            }, 500)
+            }
+        , 400)
 
-@apiBp.route('/grade/<int:grade_id>', methods=['GET'])
-def get_grade_data(grade_id):
     try:
         conn = get_db()
         with conn.cursor() as cur:
-            cur.execute('SELECT * FROM grades WHERE id = %s', (grade_id,))
-            grade = cur.fetchone()
-        
-        if not grade:
+            cur.execute(row_sql(resource.table, projection), (row_id,))
+            row = cur.fetchone()
+
+        if not row:
             return format_response(
                 {
                     'success': False,
-                    'error': 'grade not found'
+                    'error': f'{resource.singular} not found'
                 }
             , 404)
-        
-        return format_response(grade)
-    
+
+        return format_response(row)
+
     except Exception as e:
         return format_response(
             {
                 'success': False,
                 'error': str(e)
-            }, 500)
+            }
+        , 500)
 
-@apiBp.route('/grades', methods=['POST'])
-@jwt_required()
-def create_grades():
+def create_row(resource):
     try:
         data = request.get_json()
-        required_fields = ['student_name', 'course_name', 'grade', 'semester']
-        conn = get_db()
 
+        error = resource.validate_create(data)
+        if error:
+            return format_response(
+                {
+                    'success': False,
+                    'error': error
+                }
+            , 400)
 
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return format_response(
-                    {
-                        'success': False,
-                        'error': f'missing required field: {field}'
-                    }, 400)
-        
+        conn = get_db()
         with conn.cursor() as cur:
-            cur.execute('INSERT INTO grades (student_name, course_name, grade, semester) VALUES (%s, %s, %s, %s)',
-            (data['student_name'], data['course_name'], data['grade'], data['semester']))
+            states = before_write(resource, cur, 'create', [])
+            cur.execute(insert_sql(resource.table, resource.required),
+                        tuple(data[column] for column in resource.required))
+            new_id = cur.lastrowid
+            after_write(resource, cur, 'create', [new_id], states)
 
             conn.commit()
-            new_id = cur.lastrowid
+            invalidate(*resource.invalidates)
 
         return format_response(
             {
                 'success': True,
-                'message': f'grade {new_id} created successfully'
+                'message': f'{resource.singular} {new_id} created successfully'
             }, 201)
 
     except Exception as e:
@@ -529,86 +686,78 @@ def create_grades():
             {
                 'success': False,
                 'error': str(e)
-            }, 500)
+            }
+        , 500)
 
-@apiBp.route('/grade/<int:grade_id>', methods=['PUT'])
-@jwt_required()
-def update_grade(grade_id):
+def update_row(resource, row_id):
     try:
-
         data = request.get_json()
 
-        ALLOWED_FIELDS = ("student_name", "course_name", "grade", "semester")
-        update_fields, params = [], []
+        error = resource.validate_update(data)
+        if error:
+            return format_response(
+                {
+                    'success': False,
+                    'error': error
+                }
+            , 400)
 
-        conn = get_db()
+        fields = tuple(field for field in resource.updatable if field in data)
+        params = [data[field] for field in fields]
+        params.append(row_id)
 
+        conn = get_db()
         with conn.cursor() as cur:
-            cur.execute("SELECT * FROM grades WHERE id = %s", (grade_id,))
-            grade = cur.fetchone()
+            states = before_write(resource, cur, 'update', [row_id])
+            cur.execute(update_sql(resource.table, fields), params)
 
-            if not grade:
+            if cur.rowcount == 0:
                 return format_response(
                     {
                         'success': False,
-                        'error': 'grade not found'
+                        'error': f'{resource.singular} not found'
                     }
                 , 404)
 
-            for field in ALLOWED_FIELDS:
-                if field in data:
-                    update_fields.append(f"{field} = %s")
-                    params.append(data[field])
-            
-            if not update_fields:
-                return format_response({
-                    'success': False,
-                    'error': 'No fields to update'
-                }, 400)
-
-            params.append(grade_id)
-            cur.execute(f"UPDATE grades SET {', '.join(update_fields)} WHERE id = %s", params)
+            after_write(resource, cur, 'update', [row_id], states)
+            representation = fetch_representation(cur, resource, row_id)
             conn.commit()
+            invalidate(*resource.invalidates)
+
+        return updated_response(f'{resource.singular} {row_id} updated successfully', representation)
 
-        return format_response(
-            {
-                'success': True,
-                'message': f'grade {grade_id} updated successfully'
-            }
-        )
-            
     except Exception as e:
         return format_response(
             {
                 'success': False,
                 'error': str(e)
-            }, 500)
+            }
+        , 500)
 
-@apiBp.route('/grade/<int:grade_id>', methods=['DELETE'])
-@jwt_required()
-def delete_grade(grade_id):
+def delete_row(resource, row_id):
     try:
         conn = get_db()
 
         with conn.cursor() as cur:
-            cur.execute("SELECT * FROM grades WHERE id = %s", (grade_id,))
-            grade = cur.fetchone()
+            states = before_write(resource, cur, 'delete', [row_id])
+            cur.execute(delete_sql(resource.table), (row_id,))
 
-            if not grade:
+            if cur.rowcount == 0:
                 return format_response(
                     {
                         'success': False,
-                        'error': f'grade {grade_id} doesn\'t exist'
+                        'error': f'{resource.singular} {row_id} doesn\'t exist'
                     }
                 , 404)
-            
-            cur.execute("DELETE FROM grades WHERE id = %s", (grade_id,))
+
+            after_write(resource, cur, 'delete', [row_id], states)
             conn.commit()
+            invalidate(*resource.invalidates)
 
         return format_response(
             {
                 'success': True,
-                'message': f'grade {grade_id} deleted successfully'
+                'message': f'{resource.singular} {row_id} deleted successfully'
             }
         )
 
@@ -617,4 +766,35 @@ def delete_grade(grade_id):
             {
                 'success': False,
                 'error': str(e)
-            }, 500)
\ No newline at end of file
+            }
+        , 500)
+
+def add_resource_routes(bp, resource):
+    # endpoint names follow the original hand-written handlers
+    # (get_students_data, update_student, bulk_delete_students, ...) so
+    # url_for, metrics labels and cache keys stay the same
+    name, singular = resource.name, resource.singular
+    item = f'/{singular}/<int:row_id>'
+
+    def add(rule, endpoint, methods, view, *decorators):
+        def handler(**kwargs):
+            return view(resource, **kwargs)
+        handler.__name__ = endpoint
+        for decorator in decorators:
+            handler = decorator(handler)
+        bp.add_url_rule(rule, endpoint, handler, methods=methods)
+
+    read = cached(resource.table)
+    write = jwt_required()
+
+    add(f'/{name}', f'get_{name}_data', ['GET'], list_rows, read)
+    add(item, f'get_{singular}_data', ['GET'], get_row, read)
+    add(f'/{name}', f'create_{name}', ['POST'], create_row, write)
+    add(item, f'update_{singular}', ['PUT'], update_row, write)
+    add(item, f'delete_{singular}', ['DELETE'], delete_row, write)
+    add(f'/{name}/bulk', f'bulk_create_{name}', ['POST'], partial(run_bulk, bulk_create), write)
+    add(f'/{name}/bulk', f'bulk_update_{name}', ['PUT'], partial(run_bulk, bulk_update), write)
+    add(f'/{name}/bulk', f'bulk_delete_{name}', ['DELETE'], partial(run_bulk, bulk_delete), write)
+
+for resource in RESOURCES.values():
+    add_resource_routes(apiBp, resource)
@@ -0,0 +1,204 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import with_appcontext
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# static asset pipeline
+# `flask build-assets` copies every file under static/ to static/dist/ with a
+# content hash in its name (css/style.css -> css/style.1a2b3c4d5e6f.css),
+# minifying CSS and JS on the way and writing .gz and .br siblings of the
+# text files, plus manifest.json mapping the source names to the built ones.
+#
+# Builds are additive: files of earlier builds stay in place, so servers
+# and cached pages still linking them keep working, and the manifest is
+# replaced in one rename. builds.json lists the manifests of recent builds;
+# `flask prune-assets` deletes the files none of the last ASSETS_KEEP_BUILDS
+# of them use.
+#
+# With a manifest present, url_for('static', filename='css/style.css') emits
+# the hashed name. Its content can never change under that URL, so it is
+# served with a one year immutable Cache-Control and browsers stop
+# revalidating it, and the precompressed variant the client accepts is sent
+# as is. Files missing from the manifest are served from static/ as before.
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+HISTORY = 'builds.json'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+# tried in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+STRINGS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+
+def minify_css(source):
+    # comments and whitespace outside strings
+    parts = STRINGS.split(source)
+    for index in range(0, len(parts), 2):
+        text = re.sub(r'/\*.*?\*/', '', parts[index], flags=re.DOTALL)
+        text = re.sub(r'\s+', ' ', text)
+        text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+        text = re.sub(r':\s+', ':', text)
+        parts[index] = text.replace(';}', '}')
+    return ''.join(parts).strip() + '\n'
+
+def minify_js(source):
+    # conservative: drops comment-only lines, indentation and blank lines,
+    # the code itself is left alone
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//')) + '\n'
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+def source_files(static_dir):
+    for root, dirs, files in os.walk(static_dir):
+        if root == static_dir and DIST_DIR in dirs:
+            dirs.remove(DIST_DIR)
+        dirs.sort()
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            yield os.path.relpath(path, static_dir).replace(os.sep, '/'), path
+
+def hashed_name(name, content):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+
+def write_atomic(path, data):
+    # readers see the old file or the new one, never half of it
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f'{path}.tmp{os.getpid()}'
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, path)
+
+def build(static_dir):
+    # returns the manifest, {source name: built name}
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    manifest = {}
+
+    for name, path in source_files(static_dir):
+        ext = os.path.splitext(name)[1].lower()
+        with open(path, 'rb') as f:
+            content = f.read()
+        if ext in MINIFIERS:
+            content = MINIFIERS[ext](content.decode('utf8')).encode('utf8')
+
+        built = hashed_name(name, content)
+        target = os.path.join(dist_dir, built)
+        write_atomic(target, content)
+
+        if ext in COMPRESSIBLE:
+            # mtime=0 keeps the output identical between builds
+            write_atomic(target + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                write_atomic(target + '.br', brotli.compress(content))
+
+        manifest[name] = built
+
+    history = [previous for previous in load_history(static_dir) if previous != manifest]
+    write_atomic(os.path.join(dist_dir, HISTORY), json.dumps(history + [manifest], indent=2, sort_keys=True).encode())
+    write_atomic(os.path.join(dist_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+def load_history(static_dir):
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, HISTORY)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+def prune(static_dir, keep):
+    # deletes the built files that none of the last `keep` builds use,
+    # returns how many
+    if keep < 1:
+        raise ValueError('at least the current build has to be kept')
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    history = load_history(static_dir)[-keep:]
+    used = {built for manifest in history for built in manifest.values()}
+
+    removed = 0
+    for name, path in source_files(dist_dir):
+        if name in (MANIFEST, HISTORY):
+            continue
+        for _, suffix in ENCODINGS:
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+        if name not in used:
+            os.remove(path)
+            removed += 1
+
+    write_atomic(os.path.join(dist_dir, HISTORY), json.dumps(history, indent=2, sort_keys=True).encode())
+    return removed
+
+def load_manifest(static_dir):
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def asset_url_defaults(endpoint, values):
+    if endpoint != 'static' or 'filename' not in values:
+        return
+    built = current_app.extensions['asset_manifest'].get(values['filename'])
+    if built is not None:
+        values['filename'] = f'{DIST_DIR}/{built}'
+
+def serve_static(filename):
+    if not filename.startswith(f'{DIST_DIR}/'):
+        return current_app.send_static_file(filename)
+
+    dist_dir = os.path.join(current_app.static_folder, DIST_DIR)
+    name = filename[len(DIST_DIR) + 1:]
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] > 0 and os.path.isfile(os.path.join(dist_dir, name + suffix)):
+            response = send_from_directory(dist_dir, name + suffix, mimetype=mimetype,
+                                           max_age=current_app.config['ASSETS_MAX_AGE'])
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(dist_dir, name, max_age=current_app.config['ASSETS_MAX_AGE'])
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    manifest = build(current_app.static_folder)
+    click.echo(f'Built {len(manifest)} asset(s) into {os.path.join(current_app.static_folder, DIST_DIR)}.')
+    if brotli is None:
+        click.echo('brotli is not installed, only .gz variants were written', err=True)
+
+@click.command('prune-assets')
+@click.option('--keep', type=int, default=None, help='builds to keep, ASSETS_KEEP_BUILDS by default')
+@with_appcontext
+def prune_assets_command(keep):
+    removed = prune(current_app.static_folder, keep or current_app.config['ASSETS_KEEP_BUILDS'])
+    click.echo(f'Removed {removed} file(s) of older builds.')
+
+def init_app(app):
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(prune_assets_command)
+
+    # in debug the source files are served, so edits show without a rebuild
+    manifest = {}
+    if app.config['ASSETS_ENABLED'] and not app.debug:
+        manifest = load_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+
+    app.url_defaults(asset_url_defaults)
+    app.view_functions['static'] = serve_static
@@ -1,10 +1,20 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt
 from projectsite.db import get_db
+from projectsite.hashing import get_hasher, HashingBusy
+from projectsite.tokens import revoke_token
 
 authBp = Blueprint('auth', __name__, url_prefix='/auth' )
 
+def hashing_busy(e):
+    response = jsonify({
+        'status': 'error',
+        'message': 'Server is busy, please retry shortly.'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
 @authBp.route('/register', methods=['POST'])
 def register():
     try:
@@ -27,7 +37,7 @@ def register():
                     'message': 'User already exists.'
                 }), 400
         
-        hashed_password = generate_password_hash(password)
+        hashed_password = get_hasher().hash(password)
 
         with conn.cursor() as cur:
             cur.execute(
@@ -41,6 +51,8 @@ def register():
             'message': 'User registered successfully.'
         }), 201
 
+    except HashingBusy as e:
+        return hashing_busy(e)
 
     except Exception as e:
         return jsonify(
@@ -67,13 +79,27 @@ def login():
         with conn.cursor() as cur:
             cur.execute('SELECT id, password FROM users WHERE username = %s', (username,))
             user = cur.fetchone()
-            if not user or not check_password_hash(user['password'], password):
-                return jsonify({
-                    'status': 'fail',
-                    'message': 'Invalid username or password.'
-                }), 401
-            
-            access_token = create_access_token(identity=str(user['id']))
+
+        hasher = get_hasher()
+        if not user or not hasher.verify(user['password'], password):
+            return jsonify({
+                'status': 'fail',
+                'message': 'Invalid username or password.'
+            }), 401
+
+        if hasher.needs_rehash(user['password']):
+            # upgrade the stored hash to the current parameters while we
+            # have the plain password, a busy pool just leaves it for next time
+            try:
+                new_hash = hasher.hash(password)
+            except HashingBusy:
+                new_hash = None
+            if new_hash is not None:
+                with conn.cursor() as cur:
+                    cur.execute('UPDATE users SET password = %s WHERE id = %s', (new_hash, user['id']))
+                    conn.commit()
+
+        access_token = create_access_token(identity=str(user['id']))
 
         return jsonify({
             'status': 'Success',
@@ -81,10 +107,22 @@ def login():
             'username': username
         }), 200
 
+    except HashingBusy as e:
+        return hashing_busy(e)
     except Exception as e:
         return jsonify(
             {
                 'status': 'error',
                 'message': str(e)
             }
-        ), 500
\ No newline at end of file
+        ), 500
+
+@authBp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    revoke_token(get_jwt())
+
+    return jsonify({
+        'status': 'success',
+        'message': 'Token revoked.'
+    }), 200
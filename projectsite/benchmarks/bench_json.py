@@ -0,0 +1,38 @@
+# times the JSON providers on a /api/grades page worth of rows
+#
+#   python -m projectsite.benchmarks.bench_json --rows 1000 --repeat 200
+
+import argparse
+import timeit
+from flask import Flask
+from projectsite.serializers import JSON_PROVIDERS, orjson
+from projectsite.benchmarks.bench_xml import make_grades
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    # a bare app: serialization only, no database
+    app = Flask(__name__)
+    rows = make_grades(args.rows)
+
+    # flask first, it is the baseline the others are compared to
+    names = ['flask', 'stdlib', 'orjson']
+    if orjson is None:
+        names.remove('orjson')
+        print('orjson is not installed, skipping it')
+
+    print(f'{args.rows} rows per response, best of {args.repeat}')
+    with app.app_context():
+        results = {}
+        for name in names:
+            provider = JSON_PROVIDERS[name](app)
+            # same work as jsonify(rows) in format_response
+            results[name] = min(timeit.repeat(lambda: provider.response(rows), number=1, repeat=args.repeat))
+            print(f'  {name:<8} {results[name] * 1000:8.2f} ms  {args.rows / results[name]:12,.0f} rows/s'
+                  f'  {results["flask"] / results[name]:5.1f}x')
+
+if __name__ == '__main__':
+    main()
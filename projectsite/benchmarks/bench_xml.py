@@ -0,0 +1,56 @@
+# compares the built-in XML encoder with dicttoxml on synthetic grade rows
+#
+#   python -m projectsite.benchmarks.bench_xml --rows 10000 --repeat 5
+
+import argparse
+import logging
+import random
+import timeit
+from decimal import Decimal
+import dicttoxml
+from projectsite.serializers import XMLEncoder
+
+def make_grades(count):
+    rng = random.Random(42)
+    courses = ['Data Structures', 'Calculus & Analysis', 'Physics <Lab>', 'Ethics']
+    return [
+        {
+            'id': i,
+            'student_name': f'Student {i}',
+            'course_name': rng.choice(courses),
+            'grade': Decimal(f'{rng.randint(10, 50) / 10:.2f}'),
+            'semester': rng.choice(['1st', '2nd']),
+        }
+        for i in range(1, count + 1)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # dicttoxml logs every value at INFO level, don't time the log output
+    logging.getLogger('dicttoxml').setLevel(logging.WARNING)
+
+    rows = make_grades(args.rows)
+    encoder = XMLEncoder()
+
+    expected = dicttoxml.dicttoxml(rows, custom_root='response', attr_type=False)
+    assert encoder.encode(rows) == expected, 'encoder output differs from dicttoxml'
+
+    candidates = {
+        'dicttoxml': lambda: dicttoxml.dicttoxml(rows, custom_root='response', attr_type=False),
+        'XMLEncoder': lambda: encoder.encode(rows),
+    }
+
+    print(f'{args.rows} rows, best of {args.repeat}')
+    results = {}
+    for name, func in candidates.items():
+        results[name] = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(f'  {name:<12} {results[name] * 1000:9.1f} ms  {args.rows / results[name]:12,.0f} rows/s')
+
+    print(f'  speedup      {results["dicttoxml"] / results["XMLEncoder"]:9.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,554 @@
+# load test for the /api and /auth endpoints
+#
+#   python -m projectsite.benchmarks.loadtest seed --grades 1000000
+#   python -m projectsite.benchmarks.loadtest run --concurrency 16 --requests 500 --output main.json
+#   python -m projectsite.benchmarks.loadtest run --concurrency 16 --requests 500 --baseline main.json
+#   python -m projectsite.benchmarks.loadtest drop
+#
+# Uses the database from .env / the environment, the same one `flask run`
+# would. Point it at a throwaway MySQL/MariaDB, e.g.
+#   docker run -d -p 3306:3306 -e MARIADB_ROOT_PASSWORD=root -e MARIADB_DATABASE=psu mariadb
+#   flask init-db
+# Seeded rows are named loadseed_*; a run deletes the rows and users it
+# created when it finishes and `drop` removes the seed.
+#
+# By default requests go through the WSGI app in this process (one test
+# client per thread, no sockets), which measures the app and the database and
+# lets the run report memory. --url sends them to a running server instead;
+# tokens are still minted here, so it must share JWT_SECRET_KEY.
+
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+from flask_jwt_extended import create_access_token
+from projectsite import create_app
+from projectsite.api import encode_cursor
+from projectsite.db import get_db
+from projectsite.resources import RESOURCES, insert_sql, insert_rows_sql
+from projectsite.stats import rebuild_summary
+
+SEED = 'loadseed_'
+RUN = 'loadrun_'
+COURSES = [f'Course {i:02d}' for i in range(1, 51)]
+SEMESTERS = ['1st', '2nd']
+BATCH = 10000
+# rows per bulk request
+BULK_ROWS = 100
+
+# rows
+
+def make_row(resource, n, prefix, students=1):
+    # a valid row for the resource's writable columns
+    row = {}
+    for column in resource.required:
+        if column == 'email':
+            row[column] = f'{prefix}{n}@example.com'
+        elif column == 'grade':
+            row[column] = round(1 + (n * 7919 % 41) / 10, 1)
+        elif column == 'year_level':
+            row[column] = n % 4 + 1
+        elif column == 'semester':
+            row[column] = SEMESTERS[n % 2]
+        elif column == 'course_name':
+            row[column] = COURSES[n % len(COURSES)]
+        elif column == 'student_name' and resource.name == 'grades':
+            # grades point at seeded students so their keys resolve
+            row[column] = f'{SEED}student_{n % students + 1}'
+        else:
+            row[column] = f'{prefix}{column.split("_")[0]}_{n}'
+    return row
+
+def name_column(resource):
+    # the first text column, used to tell benchmark rows apart
+    return next(column for column, operator in resource.filters.items()
+                if operator == 'LIKE' and column != 'email')
+
+# seeding
+
+def seed(app, grades):
+    counts = {
+        'students': max(1, grades // 20),
+        'teachers': max(1, grades // 200),
+        'grades': grades,
+    }
+
+    with app.app_context():
+        conn = get_db()
+        for name, count in counts.items():
+            resource = RESOURCES[name]
+            query = insert_sql(resource.table, resource.required)
+            started = time.perf_counter()
+
+            with conn.cursor() as cur:
+                for start in range(0, count, BATCH):
+                    rows = [make_row(resource, n, SEED, counts['students'])
+                            for n in range(start + 1, min(start + BATCH, count) + 1)]
+                    cur.executemany(query, [tuple(row[column] for column in resource.required) for row in rows])
+                    conn.commit()
+                    print(f'\r  {name}: {min(start + BATCH, count):,} / {count:,}', end='', flush=True)
+            print(f'  ({time.perf_counter() - started:.1f}s)')
+
+        # the rows went in without the write hooks, fill in what they maintain
+        with conn.cursor() as cur:
+            cur.execute('INSERT IGNORE INTO courses (course_name) SELECT DISTINCT course_name FROM grades')
+            cur.execute('UPDATE grades g JOIN courses c ON c.course_name = g.course_name '
+                        'SET g.course_id = c.id WHERE g.course_id IS NULL')
+            cur.execute('UPDATE grades g JOIN (SELECT student_name, MIN(id) AS id FROM students GROUP BY student_name) s '
+                        'ON s.student_name = g.student_name SET g.student_id = s.id WHERE g.student_id IS NULL')
+        conn.commit()
+        if app.config['GRADE_STATS_SUMMARY']:
+            rebuild_summary()
+
+def like_prefix(prefix):
+    return prefix.replace('_', '\\_') + '%'
+
+def delete_in_batches(app, condition, params):
+    # condition maps a resource to its WHERE clause; grades go first, their
+    # student_id points at students
+    with app.app_context():
+        conn = get_db()
+        with conn.cursor() as cur:
+            for name in sorted(RESOURCES, key=lambda name: name != 'grades'):
+                resource = RESOURCES[name]
+                while cur.execute(f'DELETE FROM {resource.table} WHERE {condition(resource)} LIMIT %s',
+                                  (params(resource), BATCH)):
+                    conn.commit()
+        conn.commit()
+
+def drop_seed(app):
+    delete_in_batches(app, lambda resource: f'{name_column(resource)} LIKE %s', lambda resource: like_prefix(SEED))
+
+def last_ids(app):
+    with app.app_context():
+        conn = get_db()
+        with conn.cursor() as cur:
+            marks = {}
+            for name, resource in RESOURCES.items():
+                cur.execute(f'SELECT COALESCE(MAX(id), 0) AS id FROM {resource.table}')
+                marks[name] = cur.fetchone()['id']
+        conn.commit()
+    return marks
+
+def delete_run_rows(app, marks, run_id):
+    # everything written after the run started
+    delete_in_batches(app, lambda resource: 'id > %s', lambda resource: marks[resource.name])
+    with app.app_context():
+        conn = get_db()
+        with conn.cursor() as cur:
+            cur.execute('DELETE FROM users WHERE username LIKE %s', (like_prefix(f'{RUN}{run_id}_'),))
+        conn.commit()
+
+def seeded_ids(app):
+    # (first id, last id) of the seeded rows of every resource
+    ranges = {}
+    with app.app_context():
+        conn = get_db()
+        with conn.cursor() as cur:
+            for name, resource in RESOURCES.items():
+                cur.execute(f'SELECT MIN(id) AS low, MAX(id) AS high FROM {resource.table} '
+                            f'WHERE {name_column(resource)} LIKE %s', (like_prefix(SEED),))
+                row = cur.fetchone()
+                if row['low'] is None:
+                    raise SystemExit(f'no seeded {name}, run `seed` first')
+                ranges[name] = (row['low'], row['high'])
+        conn.commit()
+    return ranges
+
+def insert_rows(app, resource, count, students):
+    # rows for the delete scenarios to remove, written outside the timed part
+    with app.app_context():
+        conn = get_db()
+        ids = []
+        with conn.cursor() as cur:
+            # BULK_ROWS rows per INSERT, each statement's rows get consecutive
+            # ids starting at its lastrowid (one executemany would be split
+            # by the driver, and lastrowid only covers the last statement)
+            for start in range(0, count, BULK_ROWS):
+                rows = [make_row(resource, n, RUN, students) for n in range(start, min(start + BULK_ROWS, count))]
+                cur.execute(insert_rows_sql(resource.table, resource.required, len(rows)),
+                            [row[column] for row in rows for column in resource.required])
+                ids.extend(range(cur.lastrowid, cur.lastrowid + len(rows)))
+        conn.commit()
+    return ids
+
+# clients
+
+class AppClient:
+    # calls the WSGI app directly
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        # read the whole body, streamed responses are produced while iterating
+        response.get_data()
+        response.close()
+        return response.status_code
+
+
+class HTTPClient:
+    # one keep-alive connection per thread
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=60)
+        self.prefix = parts.path.rstrip('/')
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, self.prefix + path, data, headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self.connection.close()
+            raise
+        return response.status
+
+# scenarios
+
+class Scenario:
+
+    def __init__(self, name, endpoint, method, path, body=None, auth=True, token=None, expect=(200,), prepare=None):
+        self.name = name
+        self.endpoint = endpoint
+        self.method = method
+        # path(rng, state), body(rng, state) and token(state) build each
+        # request; state is whatever prepare(count) returned, set up before
+        # the timing starts
+        self.path = path
+        self.body = body
+        self.auth = auth
+        self.token = token
+        self.expect = expect
+        self.prepare = prepare
+
+
+def popper(items):
+    lock = threading.Lock()
+    def pop():
+        with lock:
+            return items.pop()
+    return pop
+
+def build_scenarios(app, ranges, run_id):
+    students = ranges['students'][1] - ranges['students'][0] + 1
+    counter = iter(range(10 ** 9))
+    scenarios = []
+
+    def random_id(name):
+        return lambda rng, state: rng.randint(*ranges[name])
+
+    for name, resource in RESOURCES.items():
+        singular, low, high = resource.singular, *ranges[name]
+        text = name_column(resource)
+
+        def page(rng, state, name=name, low=low, high=high):
+            return f'/api/{name}?limit=100&after={encode_cursor(rng.randint(low, high))}'
+
+        def tail(rng, state, name=name, high=high):
+            # the last 1000 rows, a full export would dwarf everything else
+            return f'/api/{name}?format=ndjson&after={encode_cursor(high - 1000)}'
+
+        def search(rng, state, name=name, text=text):
+            return f'/api/{name}?{text}={SEED}&match=prefix&limit=100'
+
+        def new_row(rng, state, resource=resource):
+            return make_row(resource, next(counter), RUN, students)
+
+        def seed_row(rng, state, resource=resource):
+            return make_row(resource, rng.randint(1, students), SEED, students)
+
+        def prepare_ids(count, resource=resource):
+            return popper(insert_rows(app, resource, count, students))
+
+        def prepare_batches(count, resource=resource):
+            ids = insert_rows(app, resource, count * BULK_ROWS, students)
+            return popper([ids[i:i + BULK_ROWS] for i in range(0, len(ids), BULK_ROWS)])
+
+        def bulk_update_rows(rng, state, resource=resource, low=low, high=high):
+            return [dict(seed_row(rng, state, resource), id=rng.randint(low, high)) for _ in range(BULK_ROWS)]
+
+        scenarios += [
+            Scenario(f'list_{name}', f'api.get_{name}_data', 'GET', page),
+            Scenario(f'search_{name}', f'api.get_{name}_data', 'GET', search),
+            Scenario(f'stream_{name}', f'api.get_{name}_data', 'GET', tail),
+            Scenario(f'get_{singular}', f'api.get_{singular}_data', 'GET',
+                     lambda rng, state, singular=singular, name=name: f'/api/{singular}/{random_id(name)(rng, state)}',
+                     expect=(200, 404)),
+            Scenario(f'create_{singular}', f'api.create_{name}', 'POST', lambda rng, state, name=name: f'/api/{name}',
+                     body=new_row, expect=(201,)),
+            Scenario(f'update_{singular}', f'api.update_{singular}', 'PUT',
+                     lambda rng, state, singular=singular, name=name: f'/api/{singular}/{random_id(name)(rng, state)}',
+                     body=seed_row, expect=(200, 404)),
+            Scenario(f'delete_{singular}', f'api.delete_{singular}', 'DELETE',
+                     lambda rng, state, singular=singular: f'/api/{singular}/{state()}',
+                     prepare=prepare_ids),
+            Scenario(f'bulk_create_{name}', f'api.bulk_create_{name}', 'POST', lambda rng, state, name=name: f'/api/{name}/bulk',
+                     body=lambda rng, state, new_row=new_row: [new_row(rng, state) for _ in range(BULK_ROWS)],
+                     expect=(201,)),
+            Scenario(f'bulk_update_{name}', f'api.bulk_update_{name}', 'PUT', lambda rng, state, name=name: f'/api/{name}/bulk',
+                     body=bulk_update_rows),
+            Scenario(f'bulk_delete_{name}', f'api.bulk_delete_{name}', 'DELETE', lambda rng, state, name=name: f'/api/{name}/bulk',
+                     body=lambda rng, state: state(), prepare=prepare_batches),
+        ]
+
+    def register_user(count):
+        client = AppClient(app)
+        client.request('POST', '/auth/register', {'username': f'{RUN}{run_id}_login', 'password': 'loadtest'})
+
+    def tokens(count):
+        with app.app_context():
+            return popper([create_access_token(identity='0') for _ in range(count)])
+
+    scenarios += [
+        Scenario('stats', 'api.get_stats', 'GET', lambda rng, state: '/api/stats'),
+        Scenario('grade_stats', 'api.get_grades_stats', 'GET',
+                 lambda rng, state: f'/api/grades/stats?group_by=course_name,semester'
+                                    f'&course_name={rng.choice(COURSES)}'),
+        Scenario('student_grades', 'api.get_student_grades', 'GET',
+                 lambda rng, state: f'/api/student/{random_id("students")(rng, state)}/grades',
+                 expect=(200, 404)),
+        Scenario('register', 'auth.register', 'POST', lambda rng, state: '/auth/register',
+                 body=lambda rng, state: {'username': f'{RUN}{run_id}_{next(counter)}', 'password': 'loadtest'},
+                 auth=False, expect=(201,)),
+        Scenario('login', 'auth.login', 'POST', lambda rng, state: '/auth/login',
+                 body=lambda rng, state: {'username': f'{RUN}{run_id}_login', 'password': 'loadtest'},
+                 auth=False, prepare=register_user),
+        # every logout revokes its token, so each request gets a fresh one
+        Scenario('logout', 'auth.logout', 'POST', lambda rng, state: '/auth/logout',
+                 token=lambda state: state(), prepare=tokens),
+    ]
+    return scenarios
+
+def missing_endpoints(app, scenarios):
+    # endpoints of the api and auth blueprints no scenario exercises
+    covered = {scenario.endpoint for scenario in scenarios}
+    return sorted(
+        rule.endpoint for rule in app.url_map.iter_rules()
+        if rule.endpoint.split('.')[0] in ('api', 'auth') and rule.endpoint not in covered
+    )
+
+# measuring
+
+def percentile(values, pct):
+    # nearest rank on sorted values
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))
+    return values[index]
+
+def rss_mb():
+    # current resident set size, or the peak where /proc isn't available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+def run_scenario(scenario, make_client, token, concurrency, requests, warmup, local=True):
+    state = scenario.prepare(requests + warmup) if scenario.prepare else None
+    latencies = []
+    errors = []
+    remaining = iter(range(requests + warmup))
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = make_client()
+        while True:
+            with lock:
+                number = next(remaining, None)
+            if number is None:
+                return
+
+            headers = None
+            if scenario.auth:
+                headers = {'Authorization': f'Bearer {scenario.token(state) if scenario.token else token}'}
+
+            path = scenario.path(rng, state)
+            body = scenario.body(rng, state) if scenario.body else None
+            started = time.perf_counter()
+            try:
+                status = client.request(scenario.method, path, body, headers)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+
+            if number >= warmup:
+                with lock:
+                    latencies.append(elapsed)
+                    if status not in scenario.expect:
+                        errors.append(status)
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # warmup requests are included in the wall time, so RPS is a slight underestimate
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_statuses': sorted({str(status) for status in errors}),
+        'rps': round((requests + warmup) / wall, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        # only the in-process runs have the app's memory to report
+        'rss_mb': round(rss_mb(), 1) if local else None,
+        'rss_growth_mb': round(rss_mb() - rss_before, 1) if local else None,
+    }
+
+# reporting
+
+def print_results(results):
+    print(f'{"scenario":<22}{"reqs":>7}{"errs":>6}{"rps":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"rss MB":>9}')
+    for name, result in results.items():
+        rss = f'{result["rss_mb"]:.0f}' if result['rss_mb'] is not None else '-'
+        print(f'{name:<22}{result["requests"]:>7}{result["errors"]:>6}{result["rps"]:>9.1f}'
+              f'{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}{result["p99_ms"]:>9.2f}{rss:>9}')
+        if result['errors']:
+            print(f'  unexpected responses: {", ".join(result["error_statuses"])}')
+
+def compare(results, baseline, tolerance):
+    # scenarios whose p95 grew or whose RPS fell by more than tolerance
+    regressions = []
+    print(f'\n{"scenario":<22}{"p95 ms":>18}{"change":>9}{"rps":>18}{"change":>9}')
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f'{name:<22}  (not in baseline)')
+            continue
+
+        p95_change = result['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0
+        rps_change = result['rps'] / before['rps'] - 1 if before['rps'] else 0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        if regressed:
+            regressions.append(name)
+        print(f'{name:<22}{before["p95_ms"]:>8.2f} -> {result["p95_ms"]:<7.2f}{p95_change:>+9.0%}'
+              f'{before["rps"]:>8.1f} -> {result["rps"]:<7.1f}{rps_change:>+9.0%}'
+              f'{"  REGRESSED" if regressed else ""}')
+    return regressions
+
+def disable_cache(app):
+    # CACHE_ENABLED is read once by create_app, so the cache it installed
+    # is taken out again; cached() then runs every view
+    app.config['CACHE_ENABLED'] = False
+    app.extensions.pop('response_cache', None)
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='insert benchmark rows')
+    seed_parser.add_argument('--grades', type=int, default=10000,
+                             help='grades to insert, with a student per 20 and a teacher per 200')
+
+    commands.add_parser('drop', help='delete the seeded rows')
+
+    run_parser = commands.add_parser('run', help='run the scenarios')
+    run_parser.add_argument('--concurrency', type=int, default=8)
+    run_parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    run_parser.add_argument('--warmup', type=int, default=20, help='untimed requests per scenario')
+    run_parser.add_argument('--only', help='comma-separated scenario names')
+    run_parser.add_argument('--url', help='send requests to a running server instead')
+    run_parser.add_argument('--no-cache', action='store_true', help='run with CACHE_ENABLED off (in process only)')
+    run_parser.add_argument('--output', help='write the results to this JSON file')
+    run_parser.add_argument('--baseline', help='compare with the results in this JSON file')
+    run_parser.add_argument('--tolerance', type=float, default=0.10,
+                            help='allowed p95/RPS change before a scenario counts as a regression')
+    args = parser.parse_args()
+
+    app = create_app()
+    if args.command == 'seed':
+        seed(app, args.grades)
+        return
+    if args.command == 'drop':
+        drop_seed(app)
+        return
+
+    if args.no_cache:
+        disable_cache(app)
+
+    ranges = seeded_ids(app)
+    run_id = f'{int(time.time())}'
+    scenarios = build_scenarios(app, ranges, run_id)
+
+    missing = missing_endpoints(app, scenarios)
+    if missing:
+        print(f'warning: no scenario for {", ".join(missing)}', file=sys.stderr)
+
+    if args.only:
+        wanted = set(args.only.split(','))
+        scenarios = [scenario for scenario in scenarios if scenario.name in wanted]
+
+    if args.url:
+        make_client = lambda: HTTPClient(args.url)
+    else:
+        make_client = lambda: AppClient(app)
+
+    with app.app_context():
+        token = create_access_token(identity='0')
+
+    print(f'{args.concurrency} threads, {args.requests} requests per scenario, '
+          f'{ranges["grades"][1] - ranges["grades"][0] + 1:,} seeded grades')
+
+    marks = last_ids(app)
+    results = {}
+    try:
+        for scenario in scenarios:
+            results[scenario.name] = run_scenario(scenario, make_client, token, args.concurrency,
+                                                  args.requests, args.warmup, local=not args.url)
+            print(f'  {scenario.name}: {results[scenario.name]["p95_ms"]} ms p95')
+    finally:
+        delete_run_rows(app, marks, run_id)
+
+    print()
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'concurrency': args.concurrency,
+                    'requests': args.requests,
+                    'grades': ranges['grades'][1] - ranges['grades'][0] + 1,
+                    'target': args.url or 'in-process',
+                    'python': platform.python_version(),
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                },
+                'results': results,
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f'\n{len(regressions)} scenario(s) regressed by more than {args.tolerance:.0%}')
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
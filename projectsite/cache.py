@@ -0,0 +1,305 @@
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, request, make_response
+from .replicas import get_replicas, use_primary
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class LRUCache:
+    # in-process LRU with a per-entry TTL
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    # shared cache so every worker sees the same entries and table versions
+
+    def __init__(self, url, prefix='projectsite:'):
+        if redis is None:
+            raise RuntimeError('CACHE_REDIS_URL is set but the redis package is not installed')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def get_epoch(self):
+        key = f'{self.prefix}epoch'
+        self.client.set(key, secrets.token_hex(8), nx=True)
+        return self.client.get(key).decode()
+
+    def get_versions(self, tables):
+        pipe = self.client.pipeline()
+        for table in tables:
+            pipe.hmget(f'{self.prefix}version:{table}', 'version', 'modified_at')
+        return [(int(version or 0), float(modified_at) if modified_at else None)
+                for version, modified_at in pipe.execute()]
+
+    def bump_version(self, table, modified_at):
+        pipe = self.client.pipeline()
+        pipe.hincrby(f'{self.prefix}version:{table}', 'version', 1)
+        pipe.hset(f'{self.prefix}version:{table}', 'modified_at', modified_at)
+        pipe.execute()
+
+
+class TableVersions:
+    # per-table write counters, bumped by every write endpoint
+    # they drive both cache invalidation and ETag/Last-Modified, so a
+    # conditional GET can be answered without touching MySQL
+    # the epoch keeps tags from colliding after a restart resets the counters
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.epoch = backend.get_epoch() if backend is not None else secrets.token_hex(8)
+        self.started_at = time.time()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, tables):
+        if self.backend is not None:
+            versions = self.backend.get_versions(tables)
+        else:
+            with self._lock:
+                versions = [self._versions.get(table, (0, None)) for table in tables]
+        return [(version, modified_at or self.started_at) for version, modified_at in versions]
+
+    def bump(self, table):
+        now = time.time()
+        if self.backend is not None:
+            self.backend.bump_version(table, now)
+        with self._lock:
+            version, _ = self._versions.get(table, (0, None))
+            self._versions[table] = (version + 1, now)
+
+
+class ResponseCache:
+    # read-through cache for GET responses
+    # entries are keyed on the versions of the tables they were read from, a
+    # write bumps the version so stale entries are never served again and just
+    # age out of the LRU
+
+    def __init__(self, max_entries=1024, ttl=60, backend=None):
+        self.ttl = ttl
+        self.local = LRUCache(max_entries)
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, key):
+        entry = self.local.get(key)
+
+        if entry is None and self.backend is not None:
+            entry = self.backend.get(key)
+            if entry is not None:
+                self.local.set(key, entry, self.ttl)
+
+        self._count('hits' if entry is not None else 'misses')
+        return entry
+
+    def set(self, key, entry):
+        self.local.set(key, entry, self.ttl)
+        if self.backend is not None:
+            self.backend.set(key, entry, self.ttl)
+        self._count('stores')
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_ratio'] = round(counters['hits'] / lookups, 4) if lookups else 0.0
+        counters['entries'] = len(self.local)
+        counters['max_entries'] = self.local.max_entries
+        counters['shared_backend'] = self.backend is not None
+        return counters
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+
+def get_cache():
+    return current_app.extensions.get('response_cache')
+
+def get_versions():
+    return current_app.extensions['table_versions']
+
+def cache_stats():
+    cache = get_cache()
+    return cache.stats() if cache is not None else None
+
+def invalidate(*tables):
+    versions = get_versions()
+    for table in tables:
+        versions.bump(table)
+
+    cache = get_cache()
+    if cache is not None:
+        cache._count('invalidations')
+
+def request_key():
+    args = sorted((k, v) for k, v in request.args.items(multi=True) if k != 'format')
+    args.append(('format', request.args.get('format', 'json').lower()))
+    return f'{request.endpoint}:{request.path}?{urlencode(args)}'
+
+def not_modified(etag, last_modified):
+    # If-None-Match wins over If-Modified-Since when both are sent; it uses
+    # weak comparison, compressed responses carry the tag as W/"..."
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        # see conditional_headers, the current second can still change
+        return int(last_modified) <= request.if_modified_since.timestamp() and \
+            int(last_modified) < int(time.time())
+    return False
+
+def cached(*tables):
+    # conditional + cached GET: the response is tagged with the versions of
+    # `tables`, a matching If-None-Match/If-Modified-Since gets a 304 without
+    # running the view, anything else is served from the cache until one of
+    # `tables` is written to
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = get_versions()
+            table_versions = versions.get(tables)
+            version_tag = ','.join(f'{table}={version}' for table, (version, _)
+                                   in zip(tables, table_versions))
+            key = f'{request_key()}#{version_tag}'
+
+            written_at = max(modified_at for _, modified_at in table_versions)
+            etag, last_modified = validators(versions, key, written_at)
+
+            if not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+                return conditional_headers(response, etag, last_modified)
+
+            cache = get_cache()
+            entry = cache.get(key) if cache is not None else None
+
+            # a replica may not have the latest write yet, and what the view
+            # reads is cached under the new version
+            if entry is None and get_replicas() is not None and \
+                    time.time() - written_at < current_app.config['MYSQL_REPLICA_MAX_LAG']:
+                use_primary()
+
+            if entry is not None:
+                response = make_response(entry['body'].encode('latin-1'), entry['status'])
+                response.headers.clear()
+                response.headers.extend(entry['headers'])
+                response.headers['X-Cache'] = 'HIT'
+                # the entry may have been stored in an earlier TTL window
+                return conditional_headers(response, etag, last_modified)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            conditional_headers(response, etag, last_modified)
+            if cache is not None:
+                if not response.is_streamed:
+                    cache.set(key, {
+                        'status': response.status_code,
+                        'headers': [(k, v) for k, v in response.headers.items() if k != 'Content-Length'],
+                        'body': response.get_data().decode('latin-1'),
+                    })
+                response.headers['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+    return decorator
+
+def validators(versions, key, written_at):
+    # ETag and Last-Modified of a cached() response. Without a shared
+    # backend the versions are per process and don't see the writes made
+    # through other workers, so the validators also change every CACHE_TTL
+    # seconds: a conditional GET is trusted for as long as a cached body is.
+    last_modified = written_at
+    tag = f'{versions.epoch}|{key}'
+    if versions.backend is None:
+        ttl = max(1, current_app.config['CACHE_TTL'])
+        window = int(time.time() // ttl)
+        last_modified = max(written_at, window * ttl)
+        tag += f'|{window}'
+    return hashlib.sha1(tag.encode()).hexdigest(), last_modified
+
+def conditional_headers(response, etag, last_modified):
+    # weak: the tag stands for the table versions, not the bytes, so the
+    # same tag fits every encoding of the body (compression sends W/"..."
+    # for its variants anyway) and a 304 carries exactly the 200's tag
+    response.set_etag(etag, weak=True)
+    # Last-Modified has whole seconds: while that second lasts, another
+    # write would get the same value and If-Modified-Since couldn't tell
+    # them apart, so it's only sent once the second is over (the ETag is
+    # always exact)
+    if int(last_modified) < int(time.time()):
+        response.last_modified = int(last_modified)
+    else:
+        response.headers.pop('Last-Modified', None)
+    # let clients keep the body but revalidate it on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def init_app(app):
+    backend = None
+    if app.config['CACHE_REDIS_URL']:
+        backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+
+    app.extensions['table_versions'] = TableVersions(backend)
+
+    if app.config['CACHE_ENABLED']:
+        app.extensions['response_cache'] = ResponseCache(
+            max_entries=app.config['CACHE_MAX_ENTRIES'],
+            ttl=app.config['CACHE_TTL'],
+            backend=backend,
+        )
@@ -0,0 +1,170 @@
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# response compression
+# JSON, XML, NDJSON and HTML responses of at least COMPRESS_MIN_SIZE bytes
+# are compressed with the best encoding both sides support: zstd and br
+# when their packages are installed, gzip always. Streamed responses are
+# compressed chunk by chunk, each chunk flushed so rows still reach the
+# client as they are produced.
+#
+# A compressed response keeps its ETag but as a weak one (W/"..."): the
+# bytes differ per encoding, the content doesn't, and If-None-Match uses weak
+# comparison so a client revalidating the compressed variant still gets 304.
+
+
+class GzipEncoder:
+
+    def __init__(self, level):
+        # wbits 31: zlib stream with a gzip header
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+        # brotli calls it process, brotlicffi compress
+        self._process = getattr(self._compressor, 'process', None) or self._compressor.compress
+
+    def compress(self, data):
+        return self._process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+ENCODERS = {
+    'zstd': (ZstdEncoder, 'COMPRESS_ZSTD_LEVEL'),
+    'br': (BrotliEncoder, 'COMPRESS_BR_LEVEL'),
+    'gzip': (GzipEncoder, 'COMPRESS_GZIP_LEVEL'),
+}
+
+def available_encodings(preference):
+    modules = {'zstd': zstandard, 'br': brotli, 'gzip': zlib}
+    unknown = set(preference).difference(ENCODERS)
+    if unknown:
+        raise ValueError(f'COMPRESS_ALGORITHMS must be made of: {", ".join(ENCODERS)}')
+    return tuple(name for name in preference if modules[name] is not None)
+
+def negotiate(accept_encodings, encodings):
+    # the encoding with the highest q the client gives, ties go to the
+    # server's order; None for identity
+    best, best_quality = None, 0
+    for name in encodings:
+        quality = accept_encodings[name]
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+def get_encoder(name):
+    encoder, level_key = ENCODERS[name]
+    return encoder(current_app.config[level_key])
+
+def compressible(response):
+    config = current_app.config
+    return (
+        request.method != 'HEAD'
+        and response.status_code == 200
+        and 'Content-Encoding' not in response.headers
+        and not response.direct_passthrough
+        and 'no-transform' not in response.headers.get('Cache-Control', '')
+        and response.mimetype in config['COMPRESS_MIMETYPES']
+    )
+
+
+class CompressedStream:
+    # wraps a streamed body; close() is passed on so the view's generator
+    # (and the cursor it holds) is released even if the client goes away
+    # before the first chunk
+
+    def __init__(self, body, chunks, encoder):
+        self.body = body
+        self.chunks = chunks
+        self.encoder = encoder
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            if chunk:
+                yield self.encoder.compress(chunk) + self.encoder.flush()
+        yield self.encoder.finish()
+
+    def close(self):
+        if hasattr(self.body, 'close'):
+            self.body.close()
+
+
+def compress_response(response):
+    if not compressible(response):
+        return response
+
+    # whether the body gets compressed or not, it depends on the header
+    response.vary.add('Accept-Encoding')
+
+    name = negotiate(request.accept_encodings, current_app.extensions['compression_encodings'])
+    if name is None:
+        return response
+
+    if response.is_streamed:
+        # no size known up front, always compressed
+        response.response = CompressedStream(response.response, response.iter_encoded(), get_encoder(name))
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+            return response
+        encoder = get_encoder(name)
+        response.set_data(encoder.compress(data) + encoder.finish())
+
+    response.headers['Content-Encoding'] = name
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_app(app):
+    if not app.config['COMPRESS_ENABLED']:
+        return
+
+    app.extensions['compression_encodings'] = available_encodings(app.config['COMPRESS_ALGORITHMS'])
+    app.after_request(compress_response)
@@ -1,38 +1,182 @@
-from flask_mysqldb import MySQL
-from flask import g, current_app
-import click
+import MySQLdb
+import MySQLdb.cursors
+import MySQLdb.constants.CLIENT
+from flask import g, current_app, has_request_context
+from .pool import ConnectionPool, PoolTimeout
+from . import replicas
 
-mysql = MySQL()
+try:
+    import pymysql
+    import pymysql.cursors
+    import pymysql.constants.CLIENT
+except ImportError:
+    pymysql = None
+
+# drivers
+# mysqlclient (MySQLdb) is the default. Under ASYNC_MODE = "gevent" the
+# driver has to be PyMySQL: it is pure Python, so its socket reads yield to
+# other greenlets, while mysqlclient blocks the whole process inside libmysql.
+# Both take the same connect() arguments and have the same cursor classes.
+
+DRIVERS = ("mysqlclient", "pymysql")
+ASYNC_MODES = ("off", "gevent")
+
+def resolve_driver(config):
+    mode = config["ASYNC_MODE"]
+    if mode not in ASYNC_MODES:
+        raise ValueError(f"ASYNC_MODE must be one of: {', '.join(ASYNC_MODES)}")
+
+    driver = config["MYSQL_DRIVER"] or ("pymysql" if mode == "gevent" else "mysqlclient")
+    if driver not in DRIVERS:
+        raise ValueError(f"MYSQL_DRIVER must be one of: {', '.join(DRIVERS)}")
+    if mode == "gevent" and driver != "pymysql":
+        raise ValueError('ASYNC_MODE = "gevent" needs MYSQL_DRIVER = "pymysql", mysqlclient would block every greenlet')
+    return driver
+
+def driver_module(name):
+    if name == "pymysql":
+        if pymysql is None:
+            raise RuntimeError("MYSQL_DRIVER is pymysql but the PyMySQL package is not installed")
+        return pymysql
+    return MySQLdb
+
+def connect(config, host=None, port=None):
+    driver = driver_module(config["MYSQL_DRIVER"])
+    cursorclass = getattr(driver.cursors, config.get("MYSQL_CURSORCLASS", "DictCursor"))
+
+    return driver.connect(
+        host=host or config["MYSQL_HOST"],
+        user=config["MYSQL_USER"],
+        password=config["MYSQL_PASSWORD"],
+        database=config["MYSQL_DB"],
+        port=port or config["MYSQL_PORT"],
+        charset=config["MYSQL_CHARSET"],
+        connect_timeout=config["MYSQL_CONNECT_TIMEOUT"],
+        cursorclass=cursorclass,
+        autocommit=False,
+        # rowcount of an UPDATE counts matched rows, not just changed ones,
+        # so handlers can tell "not found" from "nothing changed"
+        client_flag=driver.constants.CLIENT.FOUND_ROWS,
+    )
+
+def get_pool():
+    return current_app.extensions["db_pool"]
+
+def pool_stats():
+    return get_pool().stats()
 
 def get_db():
     if "db" not in g:
-        g.db = mysql.connection
+        g.db_pool, g.db_raw = acquire()
+        g.db = wrap_connection(g.db_raw)
     return g.db
 
+def acquire():
+    # GET and HEAD requests read from a replica when one is healthy (see
+    # replicas.py), everything else from the primary
+    if has_request_context() and replicas.reads_from_replica():
+        replica = replicas.get_replicas().choose()
+        if replica is not None:
+            try:
+                return replica.pool, replica.pool.acquire()
+            except PoolTimeout:
+                # busy, not broken: this read goes to the primary, the
+                # replica stays in
+                pass
+            except driver_module(current_app.config["MYSQL_DRIVER"]).OperationalError as e:
+                replicas.get_replicas().eject(replica, e)
+
+    pool = get_pool()
+    return pool, pool.acquire()
+
+def wrap_connection(conn):
+    # extensions such as metrics can wrap the request's connection
+    for wrapper in current_app.extensions.get("db_wrappers", ()):
+        conn = wrapper(conn)
+    return conn
+
+def get_streaming_cursor(conn):
+    # unbuffered cursor: rows stay on the server until fetched, so large
+    # exports never sit in worker memory all at once
+    return conn.cursor(driver_module(current_app.config["MYSQL_DRIVER"]).cursors.SSDictCursor)
+
 def close_db(e=None):
     g.pop("db", None)
+    pool = g.pop("db_pool", None)
+    conn = g.pop("db_raw", None)
 
-def init_db():
-    conn = get_db()
-    
-    with current_app.open_resource("badangDB.sql") as f:
-        sql_commands = f.read().decode("utf8")
+    if conn is not None:
+        pool.release(conn)
+
+def split_statements(sql):
+    # split a script on the semicolons outside quotes and comments, dropping
+    # the comments
+    statements, current = [], []
+    quote = None
+    i, length = 0, len(sql)
+
+    while i < length:
+        char = sql[i]
 
-    with conn.cursor() as cur:
-        for stmt in sql_commands.split(";"):
-            stmt = stmt.strip()
-            
-            if stmt:
-                cur.execute(stmt)
+        if quote:
+            current.append(char)
+            if char == "\\" and quote != "`" and i + 1 < length:
+                current.append(sql[i + 1])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+            current.append(char)
+        elif sql.startswith("--", i) or char == "#":
+            end = sql.find("\n", i)
+            i = length if end == -1 else end
+            continue
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            current.append(" ")
+            continue
+        elif char == ";":
+            statements.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+        i += 1
 
-    conn.commit()
-    click.echo("Initialized database.")
+    statements.append("".join(current).strip())
+    return [statement for statement in statements if statement]
 
-@click.command("init-db")
-def init_db_command():
-    init_db()
+def run_sql_file(cur, filename):
+    with current_app.open_resource(filename) as f:
+        sql_commands = f.read().decode("utf8")
+
+    for stmt in split_statements(sql_commands):
+        cur.execute(stmt)
 
 def init_app(app):
-    mysql.init_app(app)
+    config = app.config
+    config["MYSQL_DRIVER"] = resolve_driver(config)
+    driver_module(config["MYSQL_DRIVER"])
+
+    if config["ASYNC_MODE"] == "gevent":
+        # the pool's locks and the driver's sockets only cooperate once patched
+        from gevent import monkey
+        if not monkey.is_module_patched("socket"):
+            raise RuntimeError('ASYNC_MODE = "gevent" needs gevent.monkey.patch_all() before the app is imported, '
+                               'start it with python -m projectsite.serve or gunicorn -k gevent')
+
+    def make_pool(host=None, port=None):
+        return ConnectionPool(
+            lambda: connect(config, host, port),
+            min_size=config["MYSQL_POOL_MIN_SIZE"],
+            max_size=config["MYSQL_POOL_MAX_SIZE"],
+            max_lifetime=config["MYSQL_POOL_MAX_LIFETIME"],
+            idle_timeout=config["MYSQL_POOL_IDLE_TIMEOUT"],
+            timeout=config["MYSQL_POOL_TIMEOUT"],
+            ping_interval=config["MYSQL_POOL_PING_INTERVAL"],
+        )
+
+    app.extensions["db_pool"] = make_pool()
+    replicas.init_app(app, make_pool)
     app.teardown_appcontext(close_db)
-    app.cli.add_command(init_db_command)
\ No newline at end of file
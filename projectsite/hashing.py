@@ -0,0 +1,126 @@
+import atexit
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+# password hashing off the request thread
+# the KDF is deliberately slow, so hashes are computed in a process pool
+# instead of holding the GIL of the worker that serves the request. At most
+# PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE jobs are admitted at once,
+# anything beyond that is refused straight away with HashingBusy so a burst of
+# logins can't queue up behind each other and starve the rest of the app.
+# With PASSWORD_HASH_WORKERS = 0 hashes are computed inline, as before.
+
+
+class HashingBusy(Exception):
+    # raised when the hashing queue is full or a job took too long
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def full_method(method):
+    # stored hashes look like "<method>$<salt>$<hash>", and werkzeug stores
+    # the method with its defaults filled in: "scrypt" as "scrypt:32768:8:1",
+    # "pbkdf2" as "pbkdf2:sha256:<iterations>"
+    name, *args = method.split(':')
+    if name == 'scrypt' and len(args) in (0, 3):
+        return 'scrypt:' + ':'.join(args or ('32768', '8', '1'))
+    if name == 'pbkdf2' and len(args) <= 2:
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    raise ValueError(f'unsupported PASSWORD_HASH_METHOD {method!r}')
+
+
+class PasswordHasher:
+
+    def __init__(self, method='scrypt', salt_length=16, workers=2, queue_size=32, timeout=10):
+        if workers < 0 or queue_size < 0:
+            raise ValueError('PASSWORD_HASH_WORKERS and PASSWORD_HASH_QUEUE_SIZE must be >= 0')
+
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size) if workers else None
+        self._executor = None
+        self._lock = threading.Lock()
+        self.full_method = full_method(method)
+        _hashers.add(self)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        # a different KDF, KDF parameters or salt length than configured
+        method, _, rest = stored_hash.partition('$')
+        salt = rest.partition('$')[0]
+        return method != self.full_method or len(salt) != self.salt_length
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, func, *args):
+        if self._slots is None:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy('password hashing queue is full', retry_after=1)
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # the slot is held until the job is done, not just until we stop
+        # waiting: a job that timed out may already be running and can't be
+        # cancelled, and it still takes up a worker
+        future.add_done_callback(lambda f: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HashingBusy(f'password hashing took longer than {self.timeout}s',
+                              retry_after=max(1, int(self.timeout)))
+
+    def _get_executor(self):
+        # started on first use, so worker processes are forked after the app
+        # server has forked its own workers and not before
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+
+# every hasher's worker processes are stopped at exit, with one handler for
+# however many apps the process creates
+_hashers = weakref.WeakSet()
+
+@atexit.register
+def _shutdown_hashers():
+    for hasher in list(_hashers):
+        hasher.shutdown()
+
+def get_hasher():
+    return current_app.extensions['password_hasher']
+
+def init_app(app):
+    hasher = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        salt_length=app.config['PASSWORD_HASH_SALT_LENGTH'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue_size=app.config['PASSWORD_HASH_QUEUE_SIZE'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+    )
+    app.extensions['password_hasher'] = hasher
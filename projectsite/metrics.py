@@ -0,0 +1,282 @@
+import bisect
+import random
+import threading
+import time
+from flask import Blueprint, current_app, g, request
+from .cache import cache_stats
+from .db import pool_stats
+from .replicas import replica_stats
+
+metricsBp = Blueprint('metrics', __name__)
+
+# request and SQL instrumentation
+# every request's latency goes into a per-endpoint histogram; a sample of
+# requests (METRICS_SAMPLE_RATE) also get their connection wrapped so each
+# query is timed and counted. Everything is served in the Prometheus text
+# format at /metrics, and sampled requests can carry a Server-Timing header.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+ROW_COUNT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # called with the registry lock held
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_latency = {}   # (endpoint, method) -> Histogram
+        self.request_count = {}     # (endpoint, method, status) -> int
+        self.query_latency = {}     # (endpoint,) -> Histogram
+        self.query_count = {}       # (endpoint,) -> Histogram of queries per request
+        self.row_count = {}         # (endpoint,) -> Histogram of rows per request
+
+    def observe(self, family, labels, buckets, value):
+        with self._lock:
+            histogram = family.get(labels)
+            if histogram is None:
+                histogram = family[labels] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, family, labels):
+        with self._lock:
+            family[labels] = family.get(labels, 0) + 1
+
+    def histograms(self, family):
+        with self._lock:
+            return [(labels, h.buckets, list(h.counts), h.sum, h.count)
+                    for labels, h in family.items()]
+
+    def counters(self, family):
+        with self._lock:
+            return list(family.items())
+
+
+class RequestStats:
+    # per-request SQL totals of a sampled request
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.db_time = 0.0
+
+
+class InstrumentedCursor:
+    # unbuffered cursors report rowcount -1, their rows are counted as fetched
+    _unbuffered = False
+
+    def __init__(self, cursor, stats, registry, endpoint):
+        self._cursor = cursor
+        self._stats = stats
+        self._registry = registry
+        self._endpoint = endpoint
+
+    def execute(self, query, args=None):
+        return self._timed(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed(self._cursor.executemany, query, args)
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        if self._unbuffered:
+            self._stats.rows += len(rows)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if self._unbuffered and row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        if self._unbuffered:
+            self._stats.rows += len(rows)
+        return rows
+
+    def _timed(self, method, query, args):
+        started = time.perf_counter()
+        try:
+            return method(query, args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._stats.queries += 1
+            self._stats.db_time += elapsed
+            self._registry.observe(self._registry.query_latency, (self._endpoint,), LATENCY_BUCKETS, elapsed)
+
+            rowcount = getattr(self._cursor, 'rowcount', -1)
+            self._unbuffered = rowcount is None or rowcount < 0
+            if not self._unbuffered:
+                self._stats.rows += rowcount
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+
+class InstrumentedConnection:
+
+    def __init__(self, conn, stats, registry, endpoint):
+        self._conn = conn
+        self._stats = stats
+        self._registry = registry
+        self._endpoint = endpoint
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._conn.cursor(*args, **kwargs)
+        return InstrumentedCursor(cursor, self._stats, self._registry, self._endpoint)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def get_registry():
+    return current_app.extensions['metrics']
+
+def endpoint_label():
+    return request.endpoint or 'none'
+
+def wrap_connection(conn):
+    stats = g.get('metrics_stats')
+    if stats is None:
+        return conn
+    return InstrumentedConnection(conn, stats, get_registry(), endpoint_label())
+
+def start_request():
+    g.metrics_started = time.perf_counter()
+    if random.random() < current_app.config['METRICS_SAMPLE_RATE']:
+        g.metrics_stats = RequestStats()
+
+def finish_request(response):
+    started = g.get('metrics_started')
+    if started is None:
+        return response
+
+    elapsed = time.perf_counter() - started
+    registry = get_registry()
+    endpoint = endpoint_label()
+
+    registry.observe(registry.request_latency, (endpoint, request.method), LATENCY_BUCKETS, elapsed)
+    registry.increment(registry.request_count, (endpoint, request.method, str(response.status_code)))
+
+    stats = g.get('metrics_stats')
+    if stats is not None:
+        registry.observe(registry.query_count, (endpoint,), QUERY_COUNT_BUCKETS, stats.queries)
+        registry.observe(registry.row_count, (endpoint,), ROW_COUNT_BUCKETS, stats.rows)
+
+        if current_app.config['METRICS_SERVER_TIMING']:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries, {stats.rows} rows", '
+                f'app;dur={elapsed * 1000:.2f}'
+            )
+
+    return response
+
+# prometheus text format
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def render_histogram(lines, name, help_text, label_names, samples):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+
+    for labels, buckets, counts, total, count in samples:
+        cumulative = 0
+        for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+            cumulative += bucket_count
+            le = f'le="{bound}"'
+            lines.append(f'{name}_bucket{format_labels(label_names, labels, le)} {cumulative}')
+        lines.append(f'{name}_sum{format_labels(label_names, labels)} {total}')
+        lines.append(f'{name}_count{format_labels(label_names, labels)} {count}')
+
+def render_values(lines, name, metric_type, help_text, values):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {metric_type}')
+    for labels, value in values:
+        lines.append(f'{name}{labels} {value}')
+
+def render_metrics():
+    registry = get_registry()
+    lines = []
+
+    render_histogram(lines, 'projectsite_request_duration_seconds', 'Request latency.',
+                     ('endpoint', 'method'), registry.histograms(registry.request_latency))
+    render_values(lines, 'projectsite_requests_total', 'counter', 'Requests served.', [
+        (format_labels(('endpoint', 'method', 'status'), labels), value)
+        for labels, value in registry.counters(registry.request_count)
+    ])
+    render_histogram(lines, 'projectsite_db_query_duration_seconds', 'SQL statement latency (sampled requests).',
+                     ('endpoint',), registry.histograms(registry.query_latency))
+    render_histogram(lines, 'projectsite_db_queries_per_request', 'SQL statements per request (sampled requests).',
+                     ('endpoint',), registry.histograms(registry.query_count))
+    render_histogram(lines, 'projectsite_db_rows_per_request', 'Rows read or written per request (sampled requests).',
+                     ('endpoint',), registry.histograms(registry.row_count))
+
+    pool = pool_stats()
+    for key in ('size', 'idle', 'in_use', 'max_size'):
+        render_values(lines, f'projectsite_db_pool_{key}', 'gauge', f'Connection pool {key}.', [('', pool[key])])
+    for key in ('connections_created', 'connections_closed', 'checkouts', 'waits', 'timeouts', 'failed_health_checks'):
+        render_values(lines, f'projectsite_db_pool_{key}_total', 'counter', f'Connection pool {key}.', [('', pool[key])])
+
+    replicas = replica_stats()
+    if replicas is not None:
+        render_values(lines, 'projectsite_db_replica_healthy', 'gauge', 'Whether a read replica takes reads.', [
+            (format_labels(('replica',), (replica['name'],)), int(replica['healthy'])) for replica in replicas
+        ])
+        render_values(lines, 'projectsite_db_replica_lag_seconds', 'gauge', 'Read replica lag at the last check.', [
+            (format_labels(('replica',), (replica['name'],)), replica['lag'])
+            for replica in replicas if replica['lag'] is not None
+        ])
+
+    cache = cache_stats()
+    if cache is not None:
+        for key in ('hits', 'misses', 'stores', 'invalidations'):
+            render_values(lines, f'projectsite_cache_{key}_total', 'counter', f'Response cache {key}.', [('', cache[key])])
+        render_values(lines, 'projectsite_cache_entries', 'gauge', 'Response cache entries.', [('', cache['entries'])])
+
+    return '\n'.join(lines) + '\n'
+
+@metricsBp.route('/metrics')
+def metrics():
+    return current_app.response_class(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def init_app(app):
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    app.extensions['metrics'] = MetricsRegistry()
+    app.extensions.setdefault('db_wrappers', []).append(wrap_connection)
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.register_blueprint(metricsBp)
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import re
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from .db import get_db, run_sql_file, split_statements
+
+# schema migrations
+# numbered files in migrations/ (0001_name.sql, 0002_name.sql, ...) are
+# applied in order, once each, and recorded in schema_migrations together
+# with a checksum so an edited migration is noticed.
+#
+# MySQL commits DDL implicitly, so only migrations made of data statements
+# run in a transaction (together with their schema_migrations row). A
+# migration with DDL is applied statement by statement; if one fails the
+# earlier ones stay applied and the error says where it stopped.
+#
+# A file can carry directives in a comment line:
+#   -- migrate: algorithm=INPLACE lock=NONE
+# adds ", ALGORITHM=INPLACE, LOCK=NONE" to each of its ALTER TABLE
+# statements, so MySQL refuses to run them rather than falling back to a
+# table copy that blocks writes on a large production table.
+
+MIGRATIONS_DIR = 'migrations'
+FILENAME = re.compile(r'^(\d+)_(\w+)\.sql$')
+DIRECTIVE = re.compile(r'^\s*--\s*migrate:(.*)$', re.MULTILINE)
+DDL_KEYWORDS = ('ALTER', 'CREATE', 'DROP', 'RENAME', 'TRUNCATE')
+LOCK_NAME = 'projectsite:migrate'
+
+CREATE_TABLE = '''
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    duration_ms INT NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+
+    def __init__(self, version, name, sql):
+        self.version = version
+        self.name = name
+        self.checksum = hashlib.sha256(sql.encode()).hexdigest()
+        self.options = parse_directives(sql)
+        self.statements = [self.online(statement) for statement in split_statements(sql)]
+        self.transactional = not any(is_ddl(statement) for statement in self.statements)
+
+    @property
+    def filename(self):
+        return f'{self.version:04d}_{self.name}.sql'
+
+    def online(self, statement):
+        if not statement.upper().startswith('ALTER TABLE'):
+            return statement
+
+        for option in ('algorithm', 'lock'):
+            if option in self.options and f'{option.upper()}=' not in statement.upper().replace(' ', ''):
+                statement += f', {option.upper()}={self.options[option]}'
+        return statement
+
+
+def parse_directives(sql):
+    options = {}
+    for line in DIRECTIVE.findall(sql):
+        for pair in line.split():
+            key, _, value = pair.partition('=')
+            if key.lower() not in ('algorithm', 'lock') or not value:
+                raise MigrationError(f'unknown migrate directive: {pair}')
+            options[key.lower()] = value.upper()
+    return options
+
+def is_ddl(statement):
+    return statement.split(None, 1)[0].upper() in DDL_KEYWORDS
+
+def load_migrations(directory=None):
+    directory = directory or os.path.join(current_app.root_path, MIGRATIONS_DIR)
+    migrations = {}
+
+    for filename in sorted(os.listdir(directory)):
+        match = FILENAME.match(filename)
+        if not match:
+            continue
+
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f'duplicate migration version {version}: {filename}')
+
+        with open(os.path.join(directory, filename), encoding='utf8') as f:
+            migrations[version] = Migration(version, match.group(2), f.read())
+
+    return [migrations[version] for version in sorted(migrations)]
+
+def applied_migrations(cur):
+    cur.execute(CREATE_TABLE)
+    cur.execute('SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version')
+    return {row['version']: row for row in cur.fetchall()}
+
+def record(cur, migration, duration_ms):
+    cur.execute(
+        'INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s)',
+        (migration.version, migration.name, migration.checksum, duration_ms)
+    )
+
+def apply_migration(conn, migration):
+    started = time.perf_counter()
+
+    with conn.cursor() as cur:
+        for index, statement in enumerate(migration.statements, 1):
+            try:
+                cur.execute(statement)
+            except Exception as e:
+                conn.rollback()
+                if migration.transactional:
+                    raise MigrationError(f'{migration.filename} failed and was rolled back: {e}')
+                raise MigrationError(
+                    f'{migration.filename} failed at statement {index} of {len(migration.statements)}: {e}; '
+                    f'statements before it were applied (DDL is not transactional)'
+                )
+
+        record(cur, migration, int((time.perf_counter() - started) * 1000))
+    conn.commit()
+
+def pending_migrations(conn, migrations, target=None):
+    with conn.cursor() as cur:
+        applied = applied_migrations(cur)
+    conn.commit()
+
+    for migration in migrations:
+        row = applied.get(migration.version)
+        if row is not None and row['checksum'] != migration.checksum:
+            click.echo(f'warning: {migration.filename} changed after it was applied', err=True)
+
+    return [
+        migration for migration in migrations
+        if migration.version not in applied and (target is None or migration.version <= target)
+    ]
+
+def migrate(conn, migrations, target=None, echo=click.echo):
+    # serialise concurrent runs (e.g. several app servers deploying at once)
+    with conn.cursor() as cur:
+        cur.execute('SELECT GET_LOCK(%s, 60) AS locked', (LOCK_NAME,))
+        if not cur.fetchone()['locked']:
+            raise MigrationError('another migration run holds the lock')
+
+    try:
+        applied = []
+        for migration in pending_migrations(conn, migrations, target):
+            echo(f'Applying {migration.filename} ...')
+            apply_migration(conn, migration)
+            applied.append(migration)
+        return applied
+    finally:
+        with conn.cursor() as cur:
+            cur.execute('SELECT RELEASE_LOCK(%s)', (LOCK_NAME,))
+            cur.fetchall()
+
+def baseline(conn, migrations, version):
+    # mark migrations up to `version` as applied without running them, for
+    # databases whose schema already has those changes
+    with conn.cursor() as cur:
+        applied = applied_migrations(cur)
+        marked = [m for m in migrations if m.version <= version and m.version not in applied]
+        for migration in marked:
+            record(cur, migration, 0)
+    conn.commit()
+    return marked
+
+def init_db():
+    conn = get_db()
+
+    with conn.cursor() as cur:
+        run_sql_file(cur, "badangDB.sql")
+        # a fresh schema starts with no migrations applied
+        cur.execute("DROP TABLE IF EXISTS schema_migrations")
+    conn.commit()
+
+    migrate(conn, load_migrations())
+    click.echo("Initialized database.")
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    init_db()
+
+@click.command("migrate")
+@click.option("--status", is_flag=True, help="List migrations and whether they are applied.")
+@click.option("--target", type=int, help="Apply migrations up to this version only.")
+@click.option("--baseline", "baseline_version", type=int,
+              help="Mark migrations up to this version as applied without running them.")
+@with_appcontext
+def migrate_command(status, target, baseline_version):
+    conn = get_db()
+    migrations = load_migrations()
+
+    try:
+        if status:
+            with conn.cursor() as cur:
+                applied = applied_migrations(cur)
+            conn.commit()
+            for migration in migrations:
+                row = applied.get(migration.version)
+                state = f'applied {row["applied_at"]}' if row else 'pending'
+                if row and row['checksum'] != migration.checksum:
+                    state += ' (changed since)'
+                click.echo(f'{migration.filename}: {state}')
+
+        elif baseline_version is not None:
+            for migration in baseline(conn, migrations, baseline_version):
+                click.echo(f'Marked {migration.filename} as applied.')
+
+        else:
+            applied = migrate(conn, migrations, target)
+            click.echo(f'Applied {len(applied)} migration(s).' if applied else 'Database is up to date.')
+
+    except MigrationError as e:
+        raise click.ClickException(str(e))
+
+def init_app(app):
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_command)
@@ -0,0 +1,17 @@
+-- B-tree indexes behind ?match=prefix (LIKE 'value%') on the list endpoints.
+-- migrate: algorithm=INPLACE lock=NONE
+
+ALTER TABLE students
+    ADD INDEX idx_students_student_name (student_name),
+    ADD INDEX idx_students_course (course),
+    ADD INDEX idx_students_email (email);
+
+ALTER TABLE teachers
+    ADD INDEX idx_teachers_teacher_name (teacher_name),
+    ADD INDEX idx_teachers_department (department),
+    ADD INDEX idx_teachers_email (email);
+
+ALTER TABLE grades
+    ADD INDEX idx_grades_student_name (student_name),
+    ADD INDEX idx_grades_course_name (course_name),
+    ADD INDEX idx_grades_semester (semester);
@@ -0,0 +1,16 @@
+-- FULLTEXT indexes behind ?match=fulltext (MATCH ... AGAINST). InnoDB builds
+-- one FULLTEXT index per ALTER TABLE and blocks writes (but not reads) to the
+-- table while it does.
+-- migrate: algorithm=INPLACE lock=SHARED
+
+ALTER TABLE students ADD FULLTEXT INDEX ft_students_student_name (student_name);
+ALTER TABLE students ADD FULLTEXT INDEX ft_students_course (course);
+ALTER TABLE students ADD FULLTEXT INDEX ft_students_email (email);
+
+ALTER TABLE teachers ADD FULLTEXT INDEX ft_teachers_teacher_name (teacher_name);
+ALTER TABLE teachers ADD FULLTEXT INDEX ft_teachers_department (department);
+ALTER TABLE teachers ADD FULLTEXT INDEX ft_teachers_email (email);
+
+ALTER TABLE grades ADD FULLTEXT INDEX ft_grades_student_name (student_name);
+ALTER TABLE grades ADD FULLTEXT INDEX ft_grades_course_name (course_name);
+ALTER TABLE grades ADD FULLTEXT INDEX ft_grades_semester (semester);
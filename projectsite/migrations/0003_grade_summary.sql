@@ -0,0 +1,17 @@
+-- Per course and semester totals behind /api/grades/stats, kept up to date
+-- by the grade write endpoints when GRADE_STATS_SUMMARY is on. Rebuild it
+-- from scratch with `flask rebuild-grade-summary`.
+-- migrate: algorithm=INPLACE lock=NONE
+
+CREATE TABLE IF NOT EXISTS grade_summary (
+    course_name VARCHAR(255) NOT NULL,
+    semester VARCHAR(255) NOT NULL,
+    grade_count INT NOT NULL,
+    grade_sum DECIMAL(14, 2) NOT NULL,
+    grade_min DECIMAL(5, 2) NOT NULL,
+    grade_max DECIMAL(5, 2) NOT NULL,
+    PRIMARY KEY (course_name, semester)
+);
+
+-- refreshing one group reads only that group's grades
+ALTER TABLE grades ADD INDEX idx_grades_course_semester (course_name, semester);
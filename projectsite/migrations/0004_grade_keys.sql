@@ -0,0 +1,29 @@
+-- Keys for grades. student_name and course_name stay as the columns the API
+-- writes (and filters on) for compatibility; student_id and course_id are
+-- filled in from them on every write and back grades lookups by student.
+-- Adding foreign keys copies the table (no online DDL directive), so run it
+-- in a quiet window on large grades tables.
+
+CREATE TABLE IF NOT EXISTS courses (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    course_name VARCHAR(255) NOT NULL,
+    UNIQUE KEY uq_courses_course_name (course_name)
+);
+
+ALTER TABLE grades
+    ADD COLUMN student_id INT NULL,
+    ADD COLUMN course_id INT NULL,
+    ADD INDEX idx_grades_student_semester (student_id, semester),
+    ADD INDEX idx_grades_course_id_semester (course_id, semester),
+    ADD CONSTRAINT fk_grades_student FOREIGN KEY (student_id) REFERENCES students (id) ON DELETE SET NULL,
+    ADD CONSTRAINT fk_grades_course FOREIGN KEY (course_id) REFERENCES courses (id);
+
+-- backfill existing rows, a name shared by several students maps to the oldest one
+INSERT IGNORE INTO courses (course_name) SELECT DISTINCT course_name FROM grades;
+
+UPDATE grades g JOIN courses c ON c.course_name = g.course_name SET g.course_id = c.id;
+
+UPDATE grades g
+    JOIN (SELECT student_name, MIN(id) AS id FROM students GROUP BY student_name) s
+        ON s.student_name = g.student_name
+    SET g.student_id = s.id;
@@ -0,0 +1,175 @@
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    # thread-safe pool of DB-API connections
+    #   min_size       connections kept open even when idle
+    #   max_size       hard cap on open connections, checkout waits beyond it
+    #   max_lifetime   seconds before a connection is retired on its next return
+    #   idle_timeout   seconds an idle connection above min_size may stay open
+    #   ping_interval  idle seconds after which a checkout pings the server first
+
+    def __init__(self, connect, min_size=1, max_size=10, max_lifetime=3600,
+                 idle_timeout=300, timeout=10, ping_interval=30):
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError('pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1')
+
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+
+        self._lock = threading.Condition()
+        self._idle = []        # [(conn, returned_at)], oldest first
+        self._created = {}     # id(conn) -> created_at for every open connection
+        self._opening = 0      # slots reserved by checkouts that are still connecting
+        self._counters = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'failed_health_checks': 0,
+        }
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+
+        with self._lock:
+            self._counters['checkouts'] += 1
+            while True:
+                evicted = self._pop_idle_expired()
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+
+                if self._size() < self.max_size:
+                    conn, returned_at = None, None
+                    self._opening += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeout(f'no connection available within {self.timeout}s')
+                self._counters['waits'] += 1
+                self._lock.wait(remaining)
+
+        self._close_quietly(evicted)
+
+        if conn is None:
+            return self._open()
+
+        if time.monotonic() - returned_at >= self.ping_interval and not self._healthy(conn):
+            with self._lock:
+                self._counters['failed_health_checks'] += 1
+                self._forget(conn)
+                self._opening += 1
+            self._close_quietly([conn])
+            return self._open()
+
+        return conn
+
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                # never hand a half-finished transaction to the next request
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        now = time.monotonic()
+        with self._lock:
+            created_at = self._created.get(id(conn))
+            if created_at is None:
+                # not ours (e.g. the pool was reset while it was checked out)
+                discard = True
+            elif discard or now - created_at >= self.max_lifetime:
+                self._forget(conn)
+                discard = True
+            else:
+                self._idle.append((conn, now))
+            self._lock.notify()
+
+        if discard:
+            self._close_quietly([conn])
+
+    def stats(self):
+        with self._lock:
+            size = self._size()
+            idle = len(self._idle)
+            return {
+                'size': size,
+                'idle': idle,
+                'in_use': size - idle,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self._counters,
+            }
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            for conn, _ in idle:
+                self._forget(conn)
+        self._close_quietly(conn for conn, _ in idle)
+
+    # internals, callers of the _-helpers below hold self._lock unless noted
+
+    def _size(self):
+        return len(self._created) + self._opening
+
+    def _forget(self, conn):
+        if self._created.pop(id(conn), None) is not None:
+            self._counters['connections_closed'] += 1
+
+    def _pop_idle_expired(self):
+        now = time.monotonic()
+        evicted = []
+        while self._idle and self._size() > self.min_size:
+            conn, returned_at = self._idle[0]
+            if now - returned_at < self.idle_timeout:
+                break
+            self._idle.pop(0)
+            self._forget(conn)
+            evicted.append(conn)
+        return evicted
+
+    def _open(self):
+        # called without the lock, with a slot already reserved in self._opening
+        try:
+            conn = self.connect()
+        except Exception:
+            with self._lock:
+                self._opening -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self._opening -= 1
+            self._created[id(conn)] = time.monotonic()
+            self._counters['connections_created'] += 1
+        return conn
+
+    def _healthy(self, conn):
+        try:
+            conn.ping()
+            return True
+        except Exception:
+            return False
+
+    def _close_quietly(self, conns):
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
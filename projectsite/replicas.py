@@ -0,0 +1,185 @@
+import itertools
+import os
+import threading
+import time
+from flask import current_app, g, request
+
+# read replicas
+# with MYSQL_REPLICAS set, get_db() hands GET and HEAD requests a connection
+# from one of the replicas (round robin) and everything else, CLI commands
+# included, one from the primary. A replica is only used while its
+# replication lag, checked in the background every
+# MYSQL_REPLICA_CHECK_INTERVAL seconds, is at most MYSQL_REPLICA_MAX_LAG; a
+# lagging, stopped or unreachable replica is skipped until a later check
+# finds it healthy. Until the first check, reads go to the primary.
+#
+# Reads go to the primary instead when
+#   - the client wrote something in the last MYSQL_STICKY_SECONDS (a cookie
+#     set on the write's response), so it sees its own writes
+#   - the cached() response being computed reads a table written to within
+#     MYSQL_REPLICA_MAX_LAG, so a lagging replica can't put stale rows into
+#     the response cache under the table's new version
+
+STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class Replica:
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.lag = None
+        self.healthy = False
+        self.checked_at = None
+        self.error = None
+
+
+class ReplicaSet:
+    # the lag checks run in a background thread (a greenlet under gevent),
+    # so no request ever waits on a slow or dead replica; choose() only
+    # reads the state the last check left
+
+    def __init__(self, replicas, lag_check, max_lag=5, check_interval=5, background=True):
+        self.replicas = list(replicas)
+        self.lag_check = lag_check
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.background = background
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._checker_pid = None
+
+    def choose(self):
+        # a healthy replica, or None when all of them are out
+        if self.background:
+            self._start_checker()
+
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    def check(self):
+        for replica in self.replicas:
+            try:
+                conn = replica.pool.acquire()
+                try:
+                    lag = self.lag_check(conn)
+                finally:
+                    replica.pool.release(conn)
+            except Exception as e:
+                self.eject(replica, e)
+                continue
+
+            with self._lock:
+                replica.lag = lag
+                replica.healthy = lag is not None and lag <= self.max_lag
+                replica.error = None if lag is not None else 'not replicating'
+                replica.checked_at = time.monotonic()
+
+    def eject(self, replica, error):
+        # out until the next check
+        with self._lock:
+            replica.healthy = False
+            replica.error = str(error)
+            replica.checked_at = time.monotonic()
+
+    def stats(self):
+        return [
+            {
+                'name': replica.name,
+                'healthy': replica.healthy,
+                'lag': replica.lag,
+                'error': replica.error,
+                'pool': replica.pool.stats(),
+            }
+            for replica in self.replicas
+        ]
+
+    def close(self):
+        self._stopped.set()
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def _start_checker(self):
+        # started on first use and again in every forked worker, threads
+        # don't survive a fork (gunicorn --preload)
+        if self._checker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+        threading.Thread(target=self._run_checks, name='replica-lag-check', daemon=True).start()
+
+    def _run_checks(self):
+        while not self._stopped.is_set():
+            self.check()
+            self._stopped.wait(self.check_interval)
+
+
+def replication_lag(conn):
+    # seconds behind the primary, None when replication isn't running
+    with conn.cursor() as cur:
+        try:
+            cur.execute('SHOW REPLICA STATUS')
+        except Exception:
+            # MySQL before 8.0.22, MariaDB before 10.5.1
+            cur.execute('SHOW SLAVE STATUS')
+        row = cur.fetchone()
+
+    if not row:
+        return None
+    return row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+
+def get_replicas():
+    return current_app.extensions.get('db_replicas')
+
+def use_primary():
+    # get_db() returns a primary connection for the rest of this request;
+    # call it before the request's first get_db()
+    g.db_use_primary = True
+
+def reads_from_replica():
+    if get_replicas() is None or request.method not in SAFE_METHODS or g.get('db_use_primary'):
+        return False
+
+    try:
+        sticky_until = float(request.cookies.get(STICKY_COOKIE, 0))
+    except ValueError:
+        sticky_until = 0
+    return sticky_until <= time.time()
+
+def replica_stats():
+    replicas = get_replicas()
+    return replicas.stats() if replicas is not None else None
+
+def stick_to_primary(response):
+    # after a successful write, the client reads from the primary for a while
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        seconds = current_app.config['MYSQL_STICKY_SECONDS']
+        response.set_cookie(STICKY_COOKIE, f'{time.time() + seconds:.3f}', max_age=seconds,
+                            httponly=True, samesite='Lax')
+    return response
+
+def init_app(app, make_pool):
+    hosts = app.config['MYSQL_REPLICAS']
+    if isinstance(hosts, str):
+        hosts = [host.strip() for host in hosts.split(',') if host.strip()]
+    if not hosts:
+        return
+
+    replicas = []
+    for host in hosts:
+        name, _, port = host.partition(':')
+        replicas.append(Replica(host, make_pool(name, int(port) if port else app.config['MYSQL_PORT'])))
+
+    app.extensions['db_replicas'] = ReplicaSet(
+        replicas,
+        lag_check=replication_lag,
+        max_lag=app.config['MYSQL_REPLICA_MAX_LAG'],
+        check_interval=app.config['MYSQL_REPLICA_CHECK_INTERVAL'],
+    )
+    app.after_request(stick_to_primary)
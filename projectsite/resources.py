@@ -0,0 +1,262 @@
+from functools import lru_cache
+
+# resource registry
+# every table the API serves is described once here; api.py turns each entry
+# into the full set of endpoints (paginated/streamed list, get, create,
+# update, delete and the bulk variants), all cached and invalidated on write.
+# A new table only needs a register(Resource(...)) below.
+#
+# filters map a query parameter to how it's matched:
+#   'LIKE'  text column, matched according to ?match= (see api.build_filters)
+#   '='     exact match
+
+
+class Resource:
+
+    def __init__(self, name, singular, columns, filters, required=None, updatable=None, check_email=False,
+                 invalidates=None):
+        if 'id' not in columns:
+            raise ValueError(f'{name}: columns must include id')
+
+        self.name = name
+        self.table = name
+        self.singular = singular
+        self.columns = tuple(columns)
+        self.filters = dict(filters)
+        # writable columns, everything but id unless told otherwise
+        self.required = tuple(required or (column for column in self.columns if column != 'id'))
+        self.updatable = tuple(updatable or self.required)
+        self.check_email = check_email
+        # tables whose cached responses a write drops: its own, plus any the
+        # database changes along with it (foreign key actions)
+        self.invalidates = tuple(invalidates or (self.table,))
+        # WriteHook instances run inside every write transaction
+        self.hooks = []
+
+    def validate_create(self, data):
+        for field in self.required:
+            if field not in data or not data[field]:
+                return f'missing required field: {field}'
+
+        if self.check_email and '@' not in data['email']:
+            return 'invalid email formats'
+
+        return None
+
+    def validate_update(self, data):
+        if self.check_email and 'email' in data and '@' not in str(data['email']):
+            return 'Invalid email format'
+        if not any(field in data for field in self.updatable):
+            return 'No fields to update'
+        return None
+
+
+class WriteHook:
+    # runs inside the transaction of every write to a resource; action is
+    # 'create', 'update' or 'delete' and ids the rows involved (empty for
+    # before('create'), the ids aren't known yet). Whatever before returns
+    # is handed to after.
+
+    def before(self, cur, action, ids):
+        return None
+
+    def after(self, cur, action, ids, state):
+        pass
+
+
+RESOURCES = {}
+
+def register(resource):
+    RESOURCES[resource.name] = resource
+    return resource
+
+register(Resource(
+    'students', 'student',
+    columns=('id', 'student_name', 'course', 'year_level', 'email'),
+    filters={
+        'student_name': 'LIKE',
+        'course': 'LIKE',
+        'year_level': '=',
+        'email': 'LIKE'
+    },
+    check_email=True,
+    # deleting a student sets grades.student_id to NULL (fk_grades_student)
+    invalidates=('students', 'grades'),
+))
+
+register(Resource(
+    'teachers', 'teacher',
+    columns=('id', 'teacher_name', 'department', 'email'),
+    filters={
+        'teacher_name': 'LIKE',
+        'department': 'LIKE',
+        'email': 'LIKE'
+    },
+    check_email=True,
+))
+
+# grades are still written by name; student_id and course_id are derived
+# from the names by GradeKeysHook (see migrations/0004_grade_keys.sql)
+register(Resource(
+    'grades', 'grade',
+    columns=('id', 'student_id', 'student_name', 'course_id', 'course_name', 'grade', 'semester'),
+    filters={
+        'student_id': '=',
+        'student_name': 'LIKE',
+        'course_id': '=',
+        'course_name': 'LIKE',
+        'grade': '=',
+        'semester': 'LIKE'
+    },
+    required=('student_name', 'course_name', 'grade', 'semester'),
+))
+
+
+class GradeKeysHook(WriteHook):
+    # keeps student_id/course_id in step with the names of created and
+    # updated grades, adding unknown course names to courses
+
+    def after(self, cur, action, ids, state):
+        if action == 'delete' or not ids:
+            return
+        insert_courses, update_keys = grade_keys_sql(len(ids))
+        cur.execute(insert_courses, list(ids))
+        cur.execute(update_keys, list(ids))
+
+
+RESOURCES['grades'].hooks.append(GradeKeysHook())
+
+
+class StudentKeysHook(WriteHook):
+    # the other side of GradeKeysHook: creating, renaming or deleting a
+    # student re-keys the grades under the names involved (old and new), so
+    # grades written before their student existed get its id, and the
+    # grades of a deleted student move to another student of the same name
+
+    def before(self, cur, action, ids):
+        if action == 'create' or not ids:
+            return set()
+        return student_names(cur, ids)
+
+    def after(self, cur, action, ids, names):
+        if action != 'delete' and ids:
+            names = names | student_names(cur, ids)
+        if names:
+            cur.execute(student_keys_sql(len(names)), sorted(names))
+
+
+def student_names(cur, ids):
+    cur.execute(student_names_sql(len(ids)), list(ids))
+    return {row['student_name'] for row in cur.fetchall()}
+
+
+RESOURCES['students'].hooks.append(StudentKeysHook())
+
+# SQL shapes
+# every statement is built from hashable parts (table, column tuple,
+# condition tuple) and memoised, so a request only picks a prepared string
+# and binds its values. Column and table names come from the registry and
+# whitelisted query parameters, never straight from the client.
+#
+# conditions are (column, operator) pairs:
+#   '=', '>', 'LIKE'  column <op> %s
+#   'MATCH'           MATCH(column) AGAINST (%s IN BOOLEAN MODE)
+
+def _condition(column, operator):
+    if operator == 'MATCH':
+        return f'MATCH({column}) AGAINST (%s IN BOOLEAN MODE)'
+    return f'{column} {operator} %s'
+
+def where_clause(conditions):
+    if not conditions:
+        return ''
+    return ' WHERE ' + ' AND '.join(_condition(column, operator) for column, operator in conditions)
+
+@lru_cache(maxsize=1024)
+def select_sql(table, columns, conditions=(), limited=False):
+    # rows in primary key order, LIMIT %s when limited
+    query = f'SELECT {", ".join(columns)} FROM {table}' + where_clause(conditions)
+    query += ' ORDER BY id'
+    if limited:
+        query += ' LIMIT %s'
+    return query
+
+@lru_cache(maxsize=256)
+def keyset_sql(table, columns, sort, descending=False, after=False):
+    # rows in (sort, id) order, LIMIT %s; with after, only the rows past a
+    # (sort value, id) position. The row comparison is a range scan on an
+    # index on sort, InnoDB secondary indexes end with the primary key.
+    operator, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+    keys = ('id',) if sort == 'id' else (sort, 'id')
+
+    query = f'SELECT {", ".join(columns)} FROM {table}'
+    if after:
+        if len(keys) == 1:
+            query += f' WHERE id {operator} %s'
+        else:
+            query += f' WHERE ({", ".join(keys)}) {operator} (%s, %s)'
+    query += ' ORDER BY ' + ', '.join(f'{key} {direction}' for key in keys)
+    return query + ' LIMIT %s'
+
+@lru_cache(maxsize=256)
+def row_sql(table, columns):
+    return f'SELECT {", ".join(columns)} FROM {table} WHERE id = %s'
+
+@lru_cache(maxsize=64)
+def insert_sql(table, columns):
+    return f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join(["%s"] * len(columns))})'
+
+@lru_cache(maxsize=256)
+def insert_rows_sql(table, columns, count):
+    # one INSERT for `count` rows, sized by the bulk chunks
+    row = f'({", ".join(["%s"] * len(columns))})'
+    return f'INSERT INTO {table} ({", ".join(columns)}) VALUES {", ".join([row] * count)}'
+
+@lru_cache(maxsize=256)
+def update_sql(table, columns):
+    assignments = ', '.join(f'{column} = %s' for column in columns)
+    return f'UPDATE {table} SET {assignments} WHERE id = %s'
+
+@lru_cache(maxsize=64)
+def delete_sql(table):
+    return f'DELETE FROM {table} WHERE id = %s'
+
+@lru_cache(maxsize=256)
+def ids_sql(statement, table, count):
+    # SELECT id / DELETE for `count` ids, sized by the bulk chunks
+    placeholders = ', '.join(['%s'] * count)
+    if statement == 'DELETE':
+        return f'DELETE FROM {table} WHERE id IN ({placeholders})'
+    return f'SELECT id FROM {table} WHERE id IN ({placeholders})'
+
+@lru_cache(maxsize=64)
+def grade_keys_sql(count):
+    placeholders = ', '.join(['%s'] * count)
+    return (
+        'INSERT IGNORE INTO courses (course_name) '
+        f'SELECT DISTINCT course_name FROM grades WHERE id IN ({placeholders})',
+
+        'UPDATE grades SET '
+        'course_id = (SELECT id FROM courses WHERE courses.course_name = grades.course_name), '
+        'student_id = (SELECT MIN(id) FROM students WHERE students.student_name = grades.student_name) '
+        f'WHERE id IN ({placeholders})',
+    )
+
+@lru_cache(maxsize=64)
+def student_names_sql(count):
+    return f'SELECT DISTINCT student_name FROM students WHERE id IN ({", ".join(["%s"] * count)})'
+
+@lru_cache(maxsize=64)
+def student_keys_sql(count):
+    placeholders = ', '.join(['%s'] * count)
+    return (
+        'UPDATE grades SET '
+        'student_id = (SELECT MIN(id) FROM students WHERE students.student_name = grades.student_name) '
+        f'WHERE student_name IN ({placeholders})'
+    )
+
+def sql_cache_info():
+    return {
+        func.__name__: func.cache_info()._asdict()
+        for func in (select_sql, keyset_sql, row_sql, insert_sql, insert_rows_sql, update_sql, delete_sql, ids_sql)
+    }
@@ -0,0 +1,224 @@
+import dataclasses
+import json
+import numbers
+import uuid
+from datetime import date, time, timedelta
+from decimal import Decimal
+import dicttoxml
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# XML encoder for API responses
+# produces the same bytes as dicttoxml.dicttoxml(data, custom_root='response',
+# attr_type=False) for our flat row dicts, but works out each column's tags
+# once instead of validating the key with an XML parser on every value, and
+# can emit the document row by row. Anything that isn't a flat row (nested
+# dicts or lists, bytes, ...) is handed to dicttoxml so the output never
+# changes shape.
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" ?>'
+
+
+class _NotFlat(Exception):
+    pass
+
+
+def escape_xml(value):
+    return (value.replace('&', '&amp;')
+                 .replace('"', '&quot;')
+                 .replace('\'', '&apos;')
+                 .replace('<', '&lt;')
+                 .replace('>', '&gt;'))
+
+def _text_for_type(value_type):
+    # mirrors the order of checks in dicttoxml.convert_dict
+    if value_type is bool:
+        return lambda value: 'true' if value else 'false'
+    if value_type is type(None):
+        return lambda value: ''
+    if value_type is str:
+        return escape_xml
+    if issubclass(value_type, numbers.Number):
+        return str
+    if hasattr(value_type, 'isoformat'):
+        return lambda value: escape_xml(value.isoformat())
+    return None
+
+
+class XMLEncoder:
+
+    def __init__(self, root='response', item='item'):
+        self.root = root
+        self.item = item
+        self._tags = {}
+        self._converters = {}
+
+    def encode(self, data):
+        return ''.join(self.iter_encode(data)).encode('utf-8')
+
+    def iter_encode(self, data, chunk_size=500):
+        # yields the document in pieces of up to chunk_size rows
+        if isinstance(data, (list, tuple)):
+            yield f'{XML_HEADER}<{self.root}>'
+            for start in range(0, len(data), chunk_size):
+                yield self.encode_rows(data[start:start + chunk_size])
+            yield f'</{self.root}>'
+            return
+
+        if isinstance(data, dict):
+            try:
+                body = self.encode_fields(data)
+            except _NotFlat:
+                pass
+            else:
+                yield f'{XML_HEADER}<{self.root}>{body}</{self.root}>'
+                return
+
+        yield dicttoxml.dicttoxml(data, custom_root=self.root, attr_type=False).decode('utf-8')
+
+    def encode_rows(self, rows):
+        chunk = []
+        for row in rows:
+            try:
+                if not isinstance(row, dict):
+                    raise _NotFlat
+                chunk.append(f'<{self.item}>{self.encode_fields(row)}</{self.item}>')
+            except _NotFlat:
+                # exactly what dicttoxml emits for this element of the list
+                chunk.append(dicttoxml.convert_list(
+                    [row], False, self.root, False, dicttoxml.default_item_func, False
+                ))
+        return ''.join(chunk)
+
+    def encode_fields(self, row):
+        tags = self._tags
+        converters = self._converters
+        out = []
+
+        for key, value in row.items():
+            tag = tags.get(key)
+            if tag is None:
+                tag = tags[key] = self._make_tag(key)
+
+            value_type = type(value)
+            convert = converters.get(value_type)
+            if convert is None:
+                convert = _text_for_type(value_type)
+                if convert is None:
+                    raise _NotFlat
+                converters[value_type] = convert
+
+            out.append(tag[0])
+            out.append(convert(value))
+            out.append(tag[1])
+
+        return ''.join(out)
+
+    def _make_tag(self, key):
+        # dicttoxml's own name fixing, run once per distinct key
+        name, attr = dicttoxml.make_valid_xml_name(key, {})
+        return f'<{name}{dicttoxml.make_attrstring(attr)}>', f'</{name}>'
+
+
+xml_encoder = XMLEncoder()
+
+
+# JSON providers
+# installed as app.json by init_app, selected with JSON_PROVIDER:
+#   auto    orjson when it is installed, otherwise stdlib
+#   orjson  orjson, encodes straight to the response bytes
+#   stdlib  the stdlib C encoder, built once instead of on every call
+#   flask   Flask's DefaultJSONProvider, unchanged
+# both keep Flask's output: sorted keys, dates as HTTP dates, Decimal as str
+
+def json_default(o):
+    # Flask's conversions, plus the TIME columns mysqlclient returns as timedelta
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (Decimal, uuid.UUID, timedelta)):
+        return str(o)
+    if isinstance(o, time):
+        return o.isoformat()
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    default = staticmethod(json_default)
+
+    def __init__(self, app):
+        super().__init__(app)
+        options = dict(default=json_default, ensure_ascii=self.ensure_ascii, sort_keys=self.sort_keys)
+        self._encoder = json.JSONEncoder(**options)
+        self._compact_encoder = json.JSONEncoder(separators=(',', ':'), **options)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._encoder.encode(obj)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if pretty_json(self):
+            return super().response(obj)
+        return self._app.response_class(f'{self._compact_encoder.encode(obj)}\n', mimetype=self.mimetype)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    default = staticmethod(json_default)
+
+    def __init__(self, app):
+        if orjson is None:
+            raise RuntimeError('JSON_PROVIDER is "orjson" but orjson is not installed')
+        super().__init__(app)
+        # dates go through json_default so they keep Flask's HTTP date format
+        self.options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            self.options |= orjson.OPT_SORT_KEYS
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=json_default, option=self.options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self.options | orjson.OPT_APPEND_NEWLINE
+        if pretty_json(self):
+            options |= orjson.OPT_INDENT_2
+        body = orjson.dumps(obj, default=json_default, option=options)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def pretty_json(provider):
+    # same rule as DefaultJSONProvider.response
+    return (provider.compact is None and provider._app.debug) or provider.compact is False
+
+JSON_PROVIDERS = {
+    'orjson': OrjsonProvider,
+    'stdlib': StdlibJSONProvider,
+    'flask': DefaultJSONProvider,
+}
+
+def init_app(app):
+    choice = app.config['JSON_PROVIDER'].lower()
+    if choice == 'auto':
+        choice = 'orjson' if orjson is not None else 'stdlib'
+
+    if choice not in JSON_PROVIDERS:
+        raise ValueError(f'JSON_PROVIDER must be one of: auto, {", ".join(JSON_PROVIDERS)}')
+
+    app.json = JSON_PROVIDERS[choice](app)
@@ -0,0 +1,34 @@
+# cooperative server for ASYNC_MODE = "gevent"
+#
+#   ASYNC_MODE=gevent python -m projectsite.serve --host 0.0.0.0 --port 5000
+#
+# Every request runs in its own greenlet, so a request waiting on MySQL,
+# Redis or a slow client costs a few KB rather than a worker thread, and one
+# process holds up to ASYNC_MAX_CONNECTIONS requests in flight. The standard
+# library is patched when the package is imported with ASYNC_MODE=gevent in
+# the environment (see __init__.py); under gunicorn use `-k gevent` instead.
+
+import argparse
+import sys
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+from projectsite import create_app
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_app()
+    if app.config['ASYNC_MODE'] != 'gevent':
+        sys.exit('set ASYNC_MODE=gevent in the environment to use this server')
+
+    # bounds the greenlets, connections beyond it wait in the listen backlog
+    server = WSGIServer((args.host, args.port), app, spawn=Pool(app.config['ASYNC_MAX_CONNECTIONS']))
+    print(f'Serving on http://{args.host}:{args.port} '
+          f'({app.config["ASYNC_MAX_CONNECTIONS"]} concurrent requests, driver {app.config["MYSQL_DRIVER"]})')
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+// "Load more" under the table pages: fetches the next <tbody> fragment and
+// appends its rows, then points the link at the page after it. Without this
+// script the link just opens the next page.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('a[data-load-more]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  if (link.getAttribute('aria-busy') === 'true') {
+    return;
+  }
+  link.setAttribute('aria-busy', 'true');
+
+  fetch(link.dataset.loadMore)
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.status);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      var template = document.createElement('template');
+      template.innerHTML = '<table>' + html + '</table>';
+      var fragment = template.content.querySelector('tbody');
+      var target = document.querySelector(link.dataset.target);
+      target.append.apply(target, Array.prototype.slice.call(fragment.children));
+
+      if (fragment.dataset.nextRows) {
+        link.dataset.loadMore = fragment.dataset.nextRows;
+        link.href = fragment.dataset.nextPage;
+        link.removeAttribute('aria-busy');
+      } else {
+        link.parentNode.remove();
+      }
+    })
+    .catch(function () {
+      // fall back to a full page load
+      window.location = link.href;
+    });
+});
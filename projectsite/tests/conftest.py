@@ -22,10 +22,14 @@ def app():
         'MYSQL_DB': os.environ.get('MYSQL_DB', 'psu'),
         'MYSQL_CURSORCLASS': os.environ.get('MYSQL_CURSORCLASS', 'DictCursor'),
         'JWT_SECRET_KEY': os.environ.get('JWT_SECRET_KEY', 'test-secret-key'),
+        # hashes inline, no worker processes per test app
+        'PASSWORD_HASH_WORKERS': 0,
     })
 
     yield app
 
+    app.extensions['password_hasher'].shutdown()
+
     with app.app_context():
         conn = get_db()
         with conn.cursor() as cur:
@@ -1,6 +1,7 @@
 import time
 import pytest
 import json
+from werkzeug.http import http_date
 
 # ============= STUDENTS TESTS =============
 class TestStudentsAPI:
@@ -39,6 +40,84 @@ class TestStudentsAPI:
             if 'course' in student:
                 assert 'Computer' in student['course']
 
+    def test_search_students_by_prefix(self, client):
+        response = client.get('/api/students?course=Computer&match=prefix')
+
+        assert response.status_code == 200
+        for student in response.get_json():
+            assert student['course'].lower().startswith('computer')
+
+    def test_search_students_fulltext(self, client):
+        response = client.get('/api/students?course=Computer&match=fulltext')
+
+        assert response.status_code == 200
+        assert isinstance(response.get_json(), list)
+
+    def test_search_students_invalid_match(self, client):
+        response = client.get('/api/students?course=Computer&match=regex')
+
+        assert response.status_code == 400
+
+    def test_students_sparse_fields(self, client):
+        response = client.get('/api/students?fields=student_name')
+
+        assert response.status_code == 200
+        for student in response.get_json():
+            assert set(student) == {'id', 'student_name'}
+
+    def test_students_unknown_field(self, client):
+        response = client.get('/api/students?fields=password')
+
+        assert response.status_code == 400
+
+    def test_students_limit(self, client):
+        response = client.get('/api/students?limit=1')
+
+        assert response.status_code == 200
+        assert len(response.get_json()) <= 1
+
+    def test_students_next_cursor(self, client):
+        response = client.get('/api/students?limit=1')
+        cursor = response.headers.get('X-Next-Cursor')
+
+        if cursor:
+            first = response.get_json()[0]
+            response = client.get(f'/api/students?limit=1&after={cursor}')
+
+            assert response.status_code == 200
+            for student in response.get_json():
+                assert student['id'] > first['id']
+
+    def test_students_invalid_cursor(self, client):
+        response = client.get('/api/students?after=not-a-cursor')
+
+        assert response.status_code == 400
+
+    def test_students_invalid_limit(self, client):
+        response = client.get('/api/students?limit=0')
+
+        assert response.status_code == 400
+
+    def test_stream_students_json(self, client):
+        response = client.get('/api/students?stream=true')
+
+        assert response.status_code == 200
+        assert isinstance(json.loads(response.get_data(as_text=True)), list)
+
+    def test_stream_students_ndjson(self, client):
+        response = client.get('/api/students?format=ndjson')
+
+        assert response.status_code == 200
+        assert response.content_type == 'application/x-ndjson'
+        for line in response.get_data(as_text=True).splitlines():
+            assert 'id' in json.loads(line)
+
+    def test_stream_students_xml(self, client):
+        response = client.get('/api/students?format=xml&stream=true')
+
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).endswith('</response>')
+
 # ============= TEACHERS TESTS =============
 
 class TestTeachersAPI:
@@ -76,6 +155,242 @@ class TestGradesAPI:
         
         assert response.status_code == 200
 
+    def test_get_student_grades(self, client):
+        """GET /api/student/<id>/grades returns only that student's grades."""
+        response = client.get('/api/student/1/grades')
+
+        assert response.status_code in [200, 404]
+        if response.status_code == 200:
+            for grade in response.get_json():
+                assert grade['student_id'] == 1
+
+    def test_get_student_grades_next_page(self, client, auth_token):
+        """GET /api/student/<id>/grades links to its next page."""
+        headers = {'Authorization': f'Bearer {auth_token}'}
+        name = f'teststudent_grades{int(time.time())}'
+        response = client.post('/api/students/bulk', json=[
+            {'student_name': name, 'course': 'Computer Science', 'year_level': 1, 'email': 'grades@psu.edu.ph'}
+        ], headers=headers)
+        student_id = response.get_json()['results'][0]['id']
+        response = client.post('/api/grades/bulk', json=[
+            {'student_name': name, 'course_name': 'CS 101', 'grade': 1.5, 'semester': f'{i}st'}
+            for i in range(3)
+        ], headers=headers)
+        grade_ids = [result['id'] for result in response.get_json()['results']]
+
+        try:
+            response = client.get(f'/api/student/{student_id}/grades?limit=2')
+
+            assert response.status_code == 200
+            assert [grade['id'] for grade in response.get_json()] == grade_ids[:2]
+            next_url = response.headers['Link'].split(';')[0].strip('<>')
+            assert next_url.startswith(f'/api/student/{student_id}/grades?')
+
+            response = client.get(next_url)
+
+            assert response.status_code == 200
+            assert [grade['id'] for grade in response.get_json()] == grade_ids[2:]
+        finally:
+            client.delete('/api/grades/bulk', json=grade_ids, headers=headers)
+
+    def post_grades(self, client, headers, name, count):
+        response = client.post('/api/grades/bulk', json=[
+            {'student_name': name, 'course_name': 'CS 101', 'grade': 2.0, 'semester': '1st'}
+            for _ in range(count)
+        ], headers=headers)
+        return [result['id'] for result in response.get_json()['results']]
+
+    def test_student_created_after_their_grades(self, client, auth_token):
+        headers = {'Authorization': f'Bearer {auth_token}'}
+        name = f'teststudent_late{int(time.time())}'
+        grade_ids = self.post_grades(client, headers, name, 2)
+
+        try:
+            response = client.post('/api/students/bulk', json=[
+                {'student_name': name, 'course': 'Computer Science', 'year_level': 1, 'email': 'late@psu.edu.ph'}
+            ], headers=headers)
+            student_id = response.get_json()['results'][0]['id']
+
+            response = client.get(f'/api/student/{student_id}/grades')
+
+            assert [grade['id'] for grade in response.get_json()] == grade_ids
+        finally:
+            client.delete('/api/grades/bulk', json=grade_ids, headers=headers)
+
+    def test_renamed_student_takes_the_new_names_grades(self, client, auth_token):
+        headers = {'Authorization': f'Bearer {auth_token}'}
+        old_name = f'teststudent_old{int(time.time())}'
+        new_name = f'teststudent_new{int(time.time())}'
+        response = client.post('/api/students/bulk', json=[
+            {'student_name': old_name, 'course': 'Computer Science', 'year_level': 1, 'email': 'rename@psu.edu.ph'}
+        ], headers=headers)
+        student_id = response.get_json()['results'][0]['id']
+        old_ids = self.post_grades(client, headers, old_name, 1)
+        new_ids = self.post_grades(client, headers, new_name, 2)
+
+        try:
+            client.put(f'/api/student/{student_id}', json={'student_name': new_name}, headers=headers)
+
+            response = client.get(f'/api/student/{student_id}/grades')
+            assert [grade['id'] for grade in response.get_json()] == new_ids
+            assert client.get(f'/api/grade/{old_ids[0]}').get_json()['student_id'] is None
+        finally:
+            client.delete('/api/grades/bulk', json=old_ids + new_ids, headers=headers)
+
+    def test_get_grades_nonexistent_student(self, client):
+        """GET /api/student/<id>/grades returns 404 for an unknown student."""
+        response = client.get('/api/student/9999/grades')
+
+        assert response.status_code == 404
+
+    def test_grade_stats(self, client):
+        """GET /api/grades/stats returns one overall row."""
+        response = client.get('/api/grades/stats')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data) == 1
+        assert {'count', 'avg', 'min', 'max'} <= set(data[0])
+
+    def test_grade_stats_grouped(self, client):
+        """GET /api/grades/stats?group_by= returns one row per group with buckets."""
+        response = client.get('/api/grades/stats?group_by=course_name,semester&buckets=2,3')
+
+        assert response.status_code == 200
+        for row in response.get_json():
+            assert 'course_name' in row and 'semester' in row
+            assert [bucket['range'] for bucket in row['distribution']] == ['<2', '2-3', '>=3']
+            assert sum(bucket['count'] for bucket in row['distribution']) == row['count']
+
+    def test_grade_stats_invalid_group_by(self, client):
+        """GET /api/grades/stats rejects columns it can't group by."""
+        response = client.get('/api/grades/stats?group_by=grade')
+
+        assert response.status_code == 400
+
+# ============= CACHE & CONDITIONAL GET TESTS =============
+
+class TestResponseCache:
+
+    def test_repeated_get_is_cached(self, client):
+        client.get('/api/teachers?department=Computer')
+        response = client.get('/api/teachers?department=Computer')
+
+        assert response.status_code == 200
+        assert response.headers['X-Cache'] == 'HIT'
+
+    def test_write_invalidates_cache(self, client, auth_token):
+        client.get('/api/students')
+        client.post(
+            '/api/students',
+            json={
+                'student_name': 'teststudent_cache',
+                'course': 'Computer Science',
+                'year_level': 1,
+                'email': 'cache@psu.edu.ph'
+            },
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+        response = client.get('/api/students')
+
+        assert response.headers['X-Cache'] == 'MISS'
+
+    def test_etag_not_modified(self, client):
+        response = client.get('/api/grades?semester=1st')
+        etag = response.headers['ETag']
+
+        response = client.get('/api/grades?semester=1st', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.data == b''
+
+    def test_write_changes_etag(self, client, auth_token):
+        etag = client.get('/api/students').headers['ETag']
+        client.post(
+            '/api/students',
+            json={
+                'student_name': 'teststudent_etag',
+                'course': 'Computer Science',
+                'year_level': 1,
+                'email': 'etag@psu.edu.ph'
+            },
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+        response = client.get('/api/students', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_student_delete_changes_grades_etag(self, client, auth_token):
+        # grades.student_id is set to NULL by the foreign key
+        headers = {'Authorization': f'Bearer {auth_token}'}
+        response = client.post('/api/students/bulk', json=[
+            {'student_name': 'teststudent_fk', 'course': 'Computer Science', 'year_level': 1, 'email': 'fk@psu.edu.ph'}
+        ], headers=headers)
+        student_id = response.get_json()['results'][0]['id']
+        etag = client.get('/api/grades').headers['ETag']
+
+        client.delete(f'/api/student/{student_id}', headers=headers)
+        response = client.get('/api/grades', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+
+    def test_etag_expires_after_cache_ttl(self, app, client, monkeypatch):
+        etag = client.get('/api/grades?semester=1st').headers['ETag']
+
+        # another worker may have written since, its version isn't seen here
+        later = time.time() + app.config['CACHE_TTL']
+        monkeypatch.setattr(time, 'time', lambda: later)
+        response = client.get('/api/grades?semester=1st', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+
+    def test_no_last_modified_in_the_second_of_a_write(self, client, auth_token, monkeypatch):
+        now = int(time.time()) + 0.5
+        monkeypatch.setattr(time, 'time', lambda: now)
+        client.post(
+            '/api/students',
+            json={
+                'student_name': 'teststudent_lastmod',
+                'course': 'Computer Science',
+                'year_level': 1,
+                'email': 'lastmod@psu.edu.ph'
+            },
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+
+        response = client.get('/api/students')
+        assert 'Last-Modified' not in response.headers
+
+        response = client.get('/api/students', headers={'If-Modified-Since': http_date(now)})
+        assert response.status_code == 200
+
+    def test_cache_stats(self, client):
+        response = client.get('/api/stats')
+
+        assert response.status_code == 200
+        assert 'hits' in response.get_json()['cache']
+
+# ============= METRICS TESTS =============
+
+class TestMetrics:
+
+    def test_metrics_endpoint(self, client):
+        client.get('/api/teachers')
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert 'projectsite_request_duration_seconds_bucket{endpoint="api.get_teachers_data"' in response.get_data(as_text=True)
+
+    def test_server_timing_header(self, app, client):
+        app.config['METRICS_SAMPLE_RATE'] = 1.0
+        app.config['METRICS_SERVER_TIMING'] = True
+
+        response = client.get('/api/teachers?department=Computer&match=prefix')
+
+        assert response.status_code == 200
+        assert response.headers['Server-Timing'].startswith('db;dur=')
+
 # ============= PROTECTED ENDPOINT TESTS =============
 
 class TestProtectedEndpoints:
@@ -145,8 +460,141 @@ class TestProtectedEndpoints:
         )
         
         assert response.status_code in [200, 404]
+
+    def test_update_nonexistent_student(self, client, auth_token):
+        response = client.put(
+            '/api/student/9999',
+            json={'year_level': 4},
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+
+        assert response.status_code == 404
+
+    def test_update_student_return_representation(self, client, auth_token):
+        response = client.put(
+            '/api/student/1',
+            json={'year_level': 4},
+            headers={'Authorization': f'Bearer {auth_token}', 'Prefer': 'return=representation'}
+        )
+
+        assert response.status_code in [200, 404]
+        if response.status_code == 200:
+            assert response.get_json()['data']['year_level'] == 4
+            assert response.headers['Preference-Applied'] == 'return=representation'
+
+    def test_delete_nonexistent_student(self, client, auth_token):
+        response = client.delete(
+            '/api/student/9999',
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+
+        assert response.status_code == 404
     
     def test_delete_without_token(self, client):
         response = client.delete('/api/student/1')
         
-        assert response.status_code == 401
\ No newline at end of file
+        assert response.status_code == 401
+
+# ============= BULK ENDPOINT TESTS =============
+
+class TestBulkEndpoints:
+
+    def test_bulk_create_without_token(self, client):
+        response = client.post('/api/students/bulk', json=[])
+
+        assert response.status_code == 401
+
+    def test_bulk_create_students(self, client, auth_token):
+        rows = [
+            {
+                'student_name': f'teststudent_bulk{i}',
+                'course': 'Computer Science',
+                'year_level': 1,
+                'email': f'bulk{i}@psu.edu.ph'
+            }
+            for i in range(3)
+        ]
+        response = client.post(
+            '/api/students/bulk',
+            json=rows,
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+
+        assert response.status_code == 201
+        results = response.get_json()['results']
+        assert [result['index'] for result in results] == [0, 1, 2]
+        assert all(result['success'] for result in results)
+        for i, result in enumerate(results):
+            student = client.get(f'/api/student/{result["id"]}').get_json()
+            assert student['student_name'] == f'teststudent_bulk{i}'
+
+    def test_bulk_create_ids_match_stored_rows(self, app, client, auth_token):
+        app.config['API_BULK_CHUNK_SIZE'] = 2
+        rows = [
+            {
+                'student_name': f'teststudent_chunk{i}',
+                'course': 'Computer Science',
+                'year_level': 1,
+                'email': f'chunk{i}@psu.edu.ph'
+            }
+            for i in range(5)
+        ]
+        response = client.post('/api/students/bulk', json=rows, headers={'Authorization': f'Bearer {auth_token}'})
+
+        ids = [result['id'] for result in response.get_json()['results']]
+        assert len(set(ids)) == 5
+        for row_id, row in zip(ids, rows):
+            assert client.get(f'/api/student/{row_id}').get_json()['email'] == row['email']
+
+    def test_bulk_create_ndjson(self, client, auth_token):
+        rows = [
+            {
+                'student_name': f'teststudent_ndjson{i}',
+                'course': 'Computer Science',
+                'year_level': 1,
+                'email': f'ndjson{i}@psu.edu.ph'
+            }
+            for i in range(2)
+        ]
+        response = client.post(
+            '/api/students/bulk',
+            data='\n'.join(json.dumps(row) for row in rows),
+            content_type='application/x-ndjson',
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+
+        assert response.status_code == 201
+
+    def test_bulk_create_rejects_invalid_rows(self, client, auth_token):
+        rows = [
+            {
+                'student_name': 'teststudent_valid',
+                'course': 'Computer Science',
+                'year_level': 1,
+                'email': 'valid@psu.edu.ph'
+            },
+            {
+                'student_name': 'teststudent_invalid',
+                'course': 'Computer Science',
+                'year_level': 1,
+                'email': 'invalid-email'
+            }
+        ]
+        response = client.post(
+            '/api/students/bulk',
+            json=rows,
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+
+        assert response.status_code == 400
+        assert response.get_json()['results'][0]['index'] == 1
+
+    def test_bulk_delete_reports_missing_rows(self, client, auth_token):
+        response = client.delete(
+            '/api/grades/bulk',
+            json=[999999],
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+
+        assert response.status_code == 200
+        assert response.get_json()['results'][0]['success'] == False
@@ -0,0 +1,65 @@
+import gzip
+from flask import url_for
+from projectsite.assets import brotli, build, load_manifest, minify_css, minify_js, prune
+
+
+class TestAssets:
+
+    def test_minify_css(self):
+        css = '/* nav */\n.nav  a:hover {\n  color: red;\n  content: "a  b";\n}\n'
+
+        assert minify_css(css) == '.nav a:hover{color:red;content:"a  b"}\n'
+
+    def test_minify_js(self):
+        assert minify_js('// comment\nvar a = 1;\n\n    a += 1;\n') == 'var a = 1;\na += 1;\n'
+
+    def test_build(self, tmp_path):
+        (tmp_path / 'css').mkdir()
+        (tmp_path / 'css' / 'site.css').write_text('body {\n  margin: 0;\n}\n')
+
+        manifest = build(str(tmp_path))
+
+        built = manifest['css/site.css']
+        assert built.startswith('css/site.') and built.endswith('.css')
+        assert (tmp_path / 'dist' / built).read_text() == 'body{margin:0}\n'
+        assert gzip.decompress((tmp_path / 'dist' / (built + '.gz')).read_bytes()) == b'body{margin:0}\n'
+        assert load_manifest(str(tmp_path)) == manifest
+
+    def test_rebuild_keeps_previous_files_until_pruned(self, tmp_path):
+        source = tmp_path / 'site.css'
+        source.write_text('body { margin: 0; }')
+        old = build(str(tmp_path))['site.css']
+        source.write_text('body { margin: 1px; }')
+        new = build(str(tmp_path))['site.css']
+
+        dist = tmp_path / 'dist'
+        assert old != new
+        assert (dist / old).exists() and (dist / new).exists()
+
+        assert prune(str(tmp_path), keep=2) == 0
+        # the old file and its .gz (and .br)
+        assert prune(str(tmp_path), keep=1) == (3 if brotli else 2)
+
+        assert not (dist / old).exists() and not (dist / (old + '.gz')).exists()
+        assert (dist / new).exists() and (dist / (new + '.gz')).exists()
+        assert load_manifest(str(tmp_path)) == {'site.css': new}
+
+    def test_hashed_url_is_immutable(self, app, client, tmp_path):
+        (tmp_path / 'site.css').write_text('body { margin: 0; }')
+        build(str(tmp_path))
+        app.static_folder = str(tmp_path)
+        app.extensions['asset_manifest'] = load_manifest(str(tmp_path))
+
+        with app.test_request_context():
+            url = url_for('static', filename='site.css')
+        assert url.startswith('/static/dist/site.')
+
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.content_type.startswith('text/css')
+        assert 'immutable' in response.headers['Cache-Control']
+        assert gzip.decompress(response.data) == b'body{margin:0}\n'
+
+        response = client.get(url, headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == b'body{margin:0}\n'
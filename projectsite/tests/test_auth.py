@@ -1,4 +1,7 @@
 import time
+import pytest
+from projectsite.hashing import PasswordHasher, HashingBusy, full_method
+from projectsite.tokens import Blocklist
 
 
 class TestAuthAPI:
@@ -56,4 +59,90 @@ class TestAuthAPI:
             'password': 'wrongpassword'
         })
         
-        assert response.status_code == 401
\ No newline at end of file
+        assert response.status_code == 401
+
+    def test_logout_revokes_token(self, client, auth_token):
+        headers = {'Authorization': f'Bearer {auth_token}'}
+
+        response = client.post('/auth/logout', headers=headers)
+        assert response.status_code == 200
+
+        response = client.post('/auth/logout', headers=headers)
+        assert response.status_code == 401
+
+
+class TestPasswordHasher:
+
+    def test_hash_and_verify_inline(self):
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=0)
+        stored = hasher.hash('secret')
+
+        assert hasher.verify(stored, 'secret')
+        assert not hasher.verify(stored, 'wrong')
+
+    def test_hash_in_worker_process(self):
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)
+        try:
+            assert hasher.verify(hasher.hash('secret'), 'secret')
+        finally:
+            hasher.shutdown()
+
+    def test_needs_rehash(self):
+        old = PasswordHasher(method='pbkdf2:sha256:1000', workers=0)
+        new = PasswordHasher(method='pbkdf2:sha256:2000', workers=0)
+        stored = old.hash('secret')
+
+        assert not old.needs_rehash(stored)
+        assert new.needs_rehash(stored)
+
+    def test_full_method_fills_in_werkzeug_defaults(self):
+        assert full_method('scrypt') == 'scrypt:32768:8:1'
+        assert full_method('pbkdf2:sha256:1000') == 'pbkdf2:sha256:1000'
+        assert PasswordHasher(method='scrypt', workers=0).hash('secret').startswith('scrypt:32768:8:1$')
+        with pytest.raises(ValueError):
+            full_method('md5')
+
+    def test_needs_rehash_on_salt_length(self):
+        stored = PasswordHasher(method='pbkdf2:sha256:1000', salt_length=8, workers=0).hash('secret')
+
+        assert PasswordHasher(method='pbkdf2:sha256:1000', salt_length=16, workers=0).needs_rehash(stored)
+
+    def test_timed_out_job_keeps_its_slot(self):
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, queue_size=0, timeout=0.05)
+        try:
+            with pytest.raises(HashingBusy, match='longer than'):
+                hasher._run(time.sleep, 1)
+            # still running in the worker
+            with pytest.raises(HashingBusy, match='queue is full'):
+                hasher.hash('secret')
+
+            time.sleep(1.5)
+            assert hasher.verify(hasher.hash('secret'), 'secret')
+        finally:
+            hasher.shutdown()
+
+    def test_full_queue_is_rejected(self):
+        hasher = PasswordHasher(workers=1, queue_size=0)
+        hasher._slots.acquire()
+
+        with pytest.raises(HashingBusy):
+            hasher.hash('secret')
+
+
+class TestBlocklist:
+
+    def test_revoked_until_expiry(self):
+        blocklist = Blocklist()
+        blocklist.revoke('a', time.time() + 60)
+
+        assert blocklist.is_revoked('a')
+        assert not blocklist.is_revoked('b')
+
+    def test_expired_entries_dropped_on_revoke(self):
+        blocklist = Blocklist()
+        for i in range(100):
+            blocklist.revoke(f'old{i}', time.time() - 1)
+        blocklist.revoke('live', time.time() + 60)
+
+        assert len(blocklist) == 1
+        assert blocklist.is_revoked('live')
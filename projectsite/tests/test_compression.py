@@ -0,0 +1,71 @@
+import gzip
+from werkzeug.http import parse_accept_header
+from projectsite.compression import negotiate
+
+
+class TestCompression:
+
+    def test_negotiate(self):
+        accept = parse_accept_header
+
+        assert negotiate(accept('gzip, br'), ('zstd', 'br', 'gzip')) == 'br'
+        assert negotiate(accept('gzip;q=1.0, br;q=0.5'), ('zstd', 'br', 'gzip')) == 'gzip'
+        assert negotiate(accept('*'), ('gzip',)) == 'gzip'
+        assert negotiate(accept('gzip;q=0'), ('gzip',)) is None
+        assert negotiate(accept(''), ('gzip',)) is None
+
+    def test_listing_is_compressed(self, app, client):
+        app.config['COMPRESS_MIN_SIZE'] = 0
+        plain = client.get('/api/grades')
+        response = client.get('/api/grades', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data) == plain.data
+
+    def test_identity_is_untouched(self, client):
+        response = client.get('/api/grades', headers={'Accept-Encoding': 'identity'})
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_small_responses_are_not_compressed(self, app, client):
+        app.config['COMPRESS_MIN_SIZE'] = 10 ** 9
+        response = client.get('/api/grades', headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_stream_is_compressed(self, client):
+        plain = client.get('/api/grades?format=ndjson')
+        response = client.get('/api/grades?format=ndjson', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.data) == plain.data
+
+    def test_compressed_etag_revalidates(self, app, client):
+        app.config['COMPRESS_MIN_SIZE'] = 0
+        response = client.get('/api/teachers', headers={'Accept-Encoding': 'gzip'})
+        etag = response.headers['ETag']
+
+        assert etag.startswith('W/')
+        response = client.get('/api/teachers', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+
+    def test_static_page_304_carries_the_compressed_etag(self, app, client):
+        app.config['COMPRESS_MIN_SIZE'] = 0
+        response = client.get('/blog/api', headers={'Accept-Encoding': 'gzip'})
+        etag = response.headers['ETag']
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        response = client.get('/blog/api', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+
+    def test_static_files_are_left_to_the_asset_build(self, app, client):
+        # sent as passthrough, only built assets come compressed
+        app.extensions['asset_manifest'] = {}
+        response = client.get('/static/css/style.css', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        response.close()
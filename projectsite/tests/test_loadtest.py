@@ -0,0 +1,54 @@
+from projectsite.benchmarks.loadtest import (BULK_ROWS, RUN, build_scenarios, compare, disable_cache, insert_rows,
+                                             make_row, missing_endpoints, percentile)
+from projectsite.db import get_db
+from projectsite.resources import RESOURCES, ids_sql
+
+
+class TestLoadTest:
+
+    def test_every_endpoint_has_a_scenario(self, app):
+        ranges = {name: (1, 1000) for name in RESOURCES}
+        scenarios = build_scenarios(app, ranges, 'test')
+
+        assert missing_endpoints(app, scenarios) == []
+        assert len({scenario.name for scenario in scenarios}) == len(scenarios)
+
+    def test_rows_are_valid(self):
+        for resource in RESOURCES.values():
+            assert resource.validate_create(make_row(resource, 7, 'loadrun_', students=10)) is None
+
+    def test_insert_rows_returns_the_inserted_ids(self, app):
+        ids = insert_rows(app, RESOURCES['teachers'], BULK_ROWS + 5, students=1)
+
+        with app.app_context():
+            conn = get_db()
+            with conn.cursor() as cur:
+                cur.execute(f'SELECT id, teacher_name FROM teachers WHERE id IN ({", ".join(["%s"] * len(ids))})', ids)
+                rows = cur.fetchall()
+                cur.execute(ids_sql('DELETE', 'teachers', len(ids)), ids)
+            conn.commit()
+
+        assert len(set(ids)) == BULK_ROWS + 5
+        assert len(rows) == len(ids)
+        assert all(row['teacher_name'].startswith(RUN) for row in rows)
+
+    def test_no_cache_run_never_hits(self, app):
+        disable_cache(app)
+        client = app.test_client()
+
+        responses = [client.get('/api/teachers') for _ in range(2)]
+
+        assert [response.headers.get('X-Cache') for response in responses] == [None, None]
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([5], 95) == 5
+
+    def test_compare_flags_regressions(self):
+        baseline = {'a': {'p95_ms': 10.0, 'rps': 100.0}, 'b': {'p95_ms': 10.0, 'rps': 100.0}}
+        results = {'a': {'p95_ms': 10.5, 'rps': 98.0}, 'b': {'p95_ms': 15.0, 'rps': 100.0}}
+
+        assert compare(results, baseline, 0.10) == ['b']
@@ -0,0 +1,58 @@
+import pytest
+from projectsite.db import split_statements
+from projectsite.migrate import Migration, MigrationError, load_migrations
+
+
+class TestSplitStatements:
+
+    def test_ignores_semicolons_in_quotes_and_comments(self):
+        sql = '''
+        -- first; statement
+        INSERT INTO t (a) VALUES ('x;y');  /* a; b */
+        # hash comment;
+        UPDATE t SET a = "it\\"s;"
+        '''
+
+        assert split_statements(sql) == [
+            "INSERT INTO t (a) VALUES ('x;y')",
+            'UPDATE t SET a = "it\\"s;"',
+        ]
+
+
+class TestMigrations:
+
+    def test_online_directive(self):
+        migration = Migration(1, 'index', '-- migrate: algorithm=INPLACE lock=NONE\nALTER TABLE t ADD INDEX i (c);')
+
+        assert migration.statements == ['ALTER TABLE t ADD INDEX i (c), ALGORITHM=INPLACE, LOCK=NONE']
+        assert not migration.transactional
+
+    def test_data_migration_is_transactional(self):
+        migration = Migration(2, 'backfill', "UPDATE t SET c = 1; DELETE FROM t WHERE c IS NULL;")
+
+        assert migration.transactional
+        assert len(migration.statements) == 2
+
+    def test_unknown_directive(self):
+        with pytest.raises(MigrationError):
+            Migration(3, 'bad', '-- migrate: online=yes\nSELECT 1;')
+
+    def test_load_in_version_order(self, tmp_path):
+        (tmp_path / '0010_later.sql').write_text('SELECT 2;')
+        (tmp_path / '0002_earlier.sql').write_text('SELECT 1;')
+        (tmp_path / 'notes.txt').write_text('ignored')
+
+        assert [m.filename for m in load_migrations(str(tmp_path))] == ['0002_earlier.sql', '0010_later.sql']
+
+    def test_duplicate_versions(self, tmp_path):
+        (tmp_path / '0001_a.sql').write_text('SELECT 1;')
+        (tmp_path / '0001_b.sql').write_text('SELECT 2;')
+
+        with pytest.raises(MigrationError):
+            load_migrations(str(tmp_path))
+
+    def test_shipped_migrations_load(self, app):
+        with app.app_context():
+            versions = [m.version for m in load_migrations()]
+
+        assert versions == sorted(versions) and versions[0] == 1
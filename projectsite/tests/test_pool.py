@@ -0,0 +1,99 @@
+import threading
+import pytest
+from projectsite.db import resolve_driver
+from projectsite.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+        self.rollbacks = 0
+
+    def ping(self):
+        if not self.alive:
+            raise ConnectionError('gone away')
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool:
+
+    def test_reuses_released_connection(self):
+        pool = ConnectionPool(FakeConnection, max_size=2)
+
+        conn = pool.acquire()
+        pool.release(conn)
+
+        assert pool.acquire() is conn
+        assert conn.rollbacks == 1
+        assert pool.stats()['connections_created'] == 1
+
+    def test_checkout_times_out_when_exhausted(self):
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.05)
+        pool.acquire()
+
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+
+        assert pool.stats()['timeouts'] == 1
+
+    def test_waiting_checkout_gets_released_connection(self):
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=2)
+        conn = pool.acquire()
+
+        threading.Timer(0.05, pool.release, args=(conn,)).start()
+
+        assert pool.acquire() is conn
+
+    def test_dead_connection_replaced_on_checkout(self):
+        pool = ConnectionPool(FakeConnection, ping_interval=0)
+
+        conn = pool.acquire()
+        conn.alive = False
+        pool.release(conn)
+        replacement = pool.acquire()
+
+        assert replacement is not conn
+        assert conn.closed
+        assert pool.stats()['failed_health_checks'] == 1
+
+    def test_connection_retired_after_max_lifetime(self):
+        pool = ConnectionPool(FakeConnection, max_lifetime=0)
+
+        conn = pool.acquire()
+        pool.release(conn)
+
+        assert conn.closed
+        assert pool.stats()['size'] == 0
+
+    def test_idle_connections_evicted_down_to_min_size(self):
+        pool = ConnectionPool(FakeConnection, min_size=1, max_size=3, idle_timeout=0)
+
+        conns = [pool.acquire() for _ in range(3)]
+        for conn in conns:
+            pool.release(conn)
+        pool.acquire()
+
+        stats = pool.stats()
+        assert stats['size'] == 1
+        assert stats['in_use'] == 1
+
+
+class TestDrivers:
+
+    def test_driver_follows_async_mode(self):
+        assert resolve_driver({'ASYNC_MODE': 'off', 'MYSQL_DRIVER': None}) == 'mysqlclient'
+        assert resolve_driver({'ASYNC_MODE': 'off', 'MYSQL_DRIVER': 'pymysql'}) == 'pymysql'
+        assert resolve_driver({'ASYNC_MODE': 'gevent', 'MYSQL_DRIVER': None}) == 'pymysql'
+
+    def test_gevent_refuses_blocking_driver(self):
+        with pytest.raises(ValueError):
+            resolve_driver({'ASYNC_MODE': 'gevent', 'MYSQL_DRIVER': 'mysqlclient'})
+        with pytest.raises(ValueError):
+            resolve_driver({'ASYNC_MODE': 'asyncio', 'MYSQL_DRIVER': None})
@@ -0,0 +1,178 @@
+import time
+import pytest
+from flask import g
+from projectsite import create_app
+from projectsite.db import get_db, close_db, driver_module
+from projectsite.pool import PoolTimeout
+from projectsite.replicas import Replica, ReplicaSet, STICKY_COOKIE, use_primary
+
+
+class FakeConnection:
+
+    def __init__(self, lag):
+        self.lag = lag
+
+
+class FakePool:
+
+    def __init__(self, lag=0):
+        self.lag = lag
+        self.error = None
+        self.released = []
+
+    def acquire(self):
+        if self.error is not None:
+            raise self.error
+        return FakeConnection(self.lag)
+
+    def release(self, conn, discard=False):
+        self.released.append(conn)
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+def replica_set(*lags, **kwargs):
+    replicas = [Replica(f'replica{i}', FakePool(lag)) for i, lag in enumerate(lags)]
+    kwargs.setdefault('background', False)
+    return ReplicaSet(replicas, lambda conn: conn.lag, **kwargs)
+
+
+class TestReplicaSet:
+
+    def test_round_robin_over_healthy_replicas(self):
+        replicas = replica_set(0, 1)
+        replicas.check()
+
+        chosen = [replicas.choose().name for _ in range(4)]
+
+        assert chosen == ['replica0', 'replica1', 'replica0', 'replica1']
+
+    def test_no_replica_before_the_first_check(self):
+        assert replica_set(0).choose() is None
+
+    def test_lagging_replica_is_skipped(self):
+        replicas = replica_set(0, 30, max_lag=5)
+        replicas.check()
+
+        assert {replicas.choose().name for _ in range(4)} == {'replica0'}
+        assert replicas.stats()[1]['lag'] == 30
+
+    def test_stopped_replication_ejects(self):
+        replicas = replica_set(None)
+        replicas.check()
+
+        assert replicas.choose() is None
+        assert replicas.stats()[0]['error'] == 'not replicating'
+
+    def test_check_brings_replica_back(self):
+        replicas = replica_set(30, max_lag=5)
+        replicas.check()
+        assert replicas.choose() is None
+
+        replicas.replicas[0].pool.lag = 1
+        replicas.check()
+
+        assert replicas.choose().name == 'replica0'
+
+    def test_choose_does_not_check(self):
+        replicas = replica_set(0)
+        replicas.check()
+
+        replicas.replicas[0].pool.error = ConnectionError('unreachable')
+
+        assert replicas.choose().name == 'replica0'
+
+    def test_unreachable_replica_ejected(self):
+        replicas = replica_set(0)
+        replicas.replicas[0].pool.error = ConnectionError('unreachable')
+        replicas.check()
+
+        assert replicas.choose() is None
+        assert 'unreachable' in replicas.stats()[0]['error']
+
+    def test_background_checks(self):
+        replicas = replica_set(0, background=True, check_interval=0.01)
+        try:
+            replicas.choose()
+            deadline = time.monotonic() + 2
+            while replicas.choose() is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            assert replicas.choose().name == 'replica0'
+        finally:
+            replicas.close()
+
+
+class TestRouting:
+
+    @pytest.fixture
+    def app(self):
+        app = create_app({
+            'TESTING': True,
+            'MYSQL_HOST': 'primary',
+            'MYSQL_USER': 'root',
+            'MYSQL_PASSWORD': 'root',
+            'MYSQL_DB': 'psu',
+            'JWT_SECRET_KEY': 'test-secret-key',
+            'MYSQL_REPLICAS': 'replica0:3307',
+            'CACHE_ENABLED': False,
+        })
+        app.extensions['db_pool'] = FakePool()
+        app.extensions['db_replicas'] = replica_set(0)
+        app.extensions['db_replicas'].check()
+        return app
+
+    def pool_for(self, app, method='GET', cookie=None):
+        headers = {'Cookie': f'{STICKY_COOKIE}={cookie}'} if cookie else {}
+        with app.test_request_context('/', method=method, headers=headers):
+            get_db()
+            pool = g.db_pool
+            close_db()
+        return pool
+
+    def test_reads_go_to_replica(self, app):
+        replica_pool = app.extensions['db_replicas'].replicas[0].pool
+
+        assert self.pool_for(app) is replica_pool
+        assert len(replica_pool.released) == 2  # lag check and the request
+
+    def test_writes_go_to_primary(self, app):
+        assert self.pool_for(app, method='POST') is app.extensions['db_pool']
+
+    def test_recent_write_sticks_to_primary(self, app):
+        assert self.pool_for(app, cookie=time.time() + 5) is app.extensions['db_pool']
+        assert self.pool_for(app, cookie=time.time() - 1) is not app.extensions['db_pool']
+
+    def test_use_primary(self, app):
+        with app.test_request_context('/'):
+            use_primary()
+            get_db()
+            assert g.db_pool is app.extensions['db_pool']
+
+    def test_connection_error_ejects_replica(self, app):
+        replicas = app.extensions['db_replicas']
+        replicas.replicas[0].pool.error = driver_module(app.config['MYSQL_DRIVER']).OperationalError('gone away')
+
+        assert self.pool_for(app) is app.extensions['db_pool']
+        assert not replicas.stats()[0]['healthy']
+
+    def test_busy_replica_stays_in(self, app):
+        replicas = app.extensions['db_replicas']
+        replicas.replicas[0].pool.error = PoolTimeout('busy')
+
+        assert self.pool_for(app) is app.extensions['db_pool']
+        assert replicas.stats()[0]['healthy']
+
+    def test_write_response_sets_sticky_cookie(self, app):
+        @app.route('/write', methods=['POST'])
+        def write():
+            return ''
+
+        response = app.test_client().post('/write')
+
+        assert STICKY_COOKIE in response.headers['Set-Cookie']
+        assert 'Max-Age=5' in response.headers['Set-Cookie']
@@ -0,0 +1,59 @@
+from flask import Blueprint, Flask
+from projectsite.api import add_resource_routes
+from projectsite.resources import Resource, RESOURCES, insert_rows_sql, keyset_sql, select_sql, update_sql
+
+
+class TestResources:
+
+    def test_registry(self):
+        assert set(RESOURCES) == {'students', 'teachers', 'grades'}
+        assert RESOURCES['students'].required == ('student_name', 'course', 'year_level', 'email')
+
+    def test_select_sql(self):
+        query = select_sql('students', ('id', 'course'), (('course', 'LIKE'), ('id', '>')), limited=True)
+
+        assert query == 'SELECT id, course FROM students WHERE course LIKE %s AND id > %s ORDER BY id LIMIT %s'
+
+    def test_keyset_sql(self):
+        assert keyset_sql('grades', ('id', 'semester'), 'semester', descending=True, after=True) == (
+            'SELECT id, semester FROM grades WHERE (semester, id) < (%s, %s) '
+            'ORDER BY semester DESC, id DESC LIMIT %s'
+        )
+        assert keyset_sql('grades', ('id',), 'id') == 'SELECT id FROM grades ORDER BY id ASC LIMIT %s'
+
+    def test_insert_rows_sql(self):
+        assert insert_rows_sql('courses', ('course_name', 'code'), 2) == (
+            'INSERT INTO courses (course_name, code) VALUES (%s, %s), (%s, %s)'
+        )
+
+    def test_sql_shapes_are_cached(self):
+        select_sql.cache_clear()
+
+        first = update_sql('students', ('course',))
+        assert update_sql('students', ('course',)) is first
+
+        select_sql('grades', ('id',))
+        select_sql('grades', ('id',))
+        assert select_sql.cache_info().hits == 1
+
+    def test_validation(self):
+        resource = RESOURCES['teachers']
+
+        assert resource.validate_create({'teacher_name': 'A', 'department': 'B', 'email': 'a@b'}) is None
+        assert resource.validate_create({'teacher_name': 'A'}) == 'missing required field: department'
+        assert resource.validate_update({'email': 'nope'}) == 'Invalid email format'
+        assert resource.validate_update({'unknown': 1}) == 'No fields to update'
+
+    def test_new_resource_gets_every_endpoint(self):
+        app = Flask(__name__)
+        bp = Blueprint('extra', __name__, url_prefix='/api')
+        add_resource_routes(bp, Resource('courses', 'course', columns=('id', 'title'), filters={'title': 'LIKE'}))
+        app.register_blueprint(bp)
+
+        endpoints = {rule.endpoint for rule in app.url_map.iter_rules()}
+
+        assert {
+            'extra.get_courses_data', 'extra.get_course_data', 'extra.create_courses',
+            'extra.update_course', 'extra.delete_course', 'extra.bulk_create_courses',
+            'extra.bulk_update_courses', 'extra.bulk_delete_courses',
+        } <= endpoints
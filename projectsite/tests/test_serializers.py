@@ -0,0 +1,96 @@
+import datetime
+from decimal import Decimal
+import dicttoxml
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from projectsite.serializers import XMLEncoder, StdlibJSONProvider, OrjsonProvider, orjson
+
+
+def dicttoxml_response(data):
+    return dicttoxml.dicttoxml(data, custom_root='response', attr_type=False)
+
+
+class TestXMLEncoder:
+
+    def test_rows_match_dicttoxml(self):
+        rows = [
+            {
+                'id': 1,
+                'student_name': 'Juan & "Maria" <Cruz>',
+                'grade': Decimal('1.75'),
+                'semester': None,
+                'active': True,
+                'enrolled': datetime.date(2024, 6, 1),
+            },
+            {
+                'id': 2,
+                'student_name': "O'Neil",
+                'grade': 2.5,
+                'semester': '2nd',
+                'active': False,
+                'enrolled': datetime.datetime(2024, 6, 1, 8, 30),
+            },
+        ]
+
+        assert XMLEncoder().encode(rows) == dicttoxml_response(rows)
+
+    def test_empty_list_matches_dicttoxml(self):
+        assert XMLEncoder().encode([]) == dicttoxml_response([])
+
+    def test_single_record_matches_dicttoxml(self):
+        data = {'success': False, 'error': 'student not found'}
+
+        assert XMLEncoder().encode(data) == dicttoxml_response(data)
+
+    def test_nested_data_falls_back_to_dicttoxml(self):
+        data = {
+            'success': True,
+            'results': [{'index': 0, 'success': True, 'id': 7}]
+        }
+
+        assert XMLEncoder().encode(data) == dicttoxml_response(data)
+
+    def test_invalid_keys_match_dicttoxml(self):
+        rows = [{'2nd grade': 1, 'full name': 'x'}]
+
+        assert XMLEncoder().encode(rows) == dicttoxml_response(rows)
+
+    def test_iter_encode_yields_chunks(self):
+        rows = [{'id': i} for i in range(5)]
+        chunks = list(XMLEncoder().iter_encode(rows, chunk_size=2))
+
+        assert len(chunks) == 5
+        assert ''.join(chunks).encode() == dicttoxml_response(rows)
+
+
+class TestJSONProviders:
+
+    rows = [
+        {
+            'id': 1,
+            'student_name': 'Juan',
+            'grade': Decimal('1.75'),
+            'enrolled': datetime.date(2024, 6, 1),
+            'semester': None,
+        }
+    ]
+
+    @pytest.mark.parametrize('provider_class', [
+        StdlibJSONProvider,
+        pytest.param(OrjsonProvider, marks=pytest.mark.skipif(orjson is None, reason='orjson not installed')),
+    ])
+    def test_response_matches_flask(self, provider_class):
+        app = Flask(__name__)
+
+        with app.app_context():
+            expected = DefaultJSONProvider(app).response(self.rows).get_data()
+            response = provider_class(app).response(self.rows)
+
+        assert response.get_data() == expected
+        assert response.mimetype == 'application/json'
+
+    def test_app_uses_configured_provider(self, app):
+        expected = OrjsonProvider if orjson is not None else StdlibJSONProvider
+
+        assert isinstance(app.json, expected)
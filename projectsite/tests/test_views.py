@@ -0,0 +1,81 @@
+import re
+from projectsite.views import encode_position
+
+
+class TestTablePages:
+
+    def test_students_page(self, client):
+        response = client.get('/blog/students')
+
+        assert response.status_code == 200
+        assert b'<tbody id="rows"' in response.data
+
+    def test_page_size_is_bounded(self, app, client):
+        app.config['BLOG_PAGE_SIZE'] = 1
+        response = client.get('/blog/teachers?sort=teacher_name')
+
+        assert response.status_code == 200
+        assert response.data.count(b'<tr>') <= 2   # header row and one data row
+
+    def test_load_more_fragment(self, app, client):
+        app.config['BLOG_PAGE_SIZE'] = 1
+        html = client.get('/blog/students?sort=student_name&order=desc').get_data(as_text=True)
+
+        match = re.search(r'data-load-more="([^"]+)"', html)
+
+        if match:
+            response = client.get(match.group(1).replace('&amp;', '&'))
+
+            assert response.status_code == 200
+            assert response.get_data(as_text=True).startswith('<tbody')
+            assert b'<html' not in response.data
+
+    def test_unsortable_column(self, client):
+        response = client.get('/blog/grades?sort=grade')
+
+        assert response.status_code == 400
+
+    def test_invalid_cursor(self, client):
+        response = client.get('/blog/grades/rows?after=nope')
+
+        assert response.status_code == 400
+
+    def test_cursor_value_must_be_scalar(self, client):
+        for value in ([1, 2], {'a': 1}, True, None):
+            cursor = encode_position(value, 1)
+            response = client.get(f'/blog/students/rows?sort=student_name&after={cursor}')
+
+            assert response.status_code == 400
+
+    def test_page_is_cached(self, client):
+        client.get('/blog/teachers?sort=department')
+        response = client.get('/blog/teachers?sort=department')
+
+        assert response.headers['X-Cache'] == 'HIT'
+
+    def test_write_invalidates_page(self, client, auth_token):
+        client.get('/blog/students')
+        client.post('/api/students', json={
+            'student_name': 'teststudent_page',
+            'course': 'BSCS',
+            'year_level': 1,
+            'email': 'teststudent_page@example.com'
+        }, headers={'Authorization': f'Bearer {auth_token}'})
+
+        response = client.get('/blog/students')
+        assert response.headers['X-Cache'] == 'MISS'
+
+
+class TestStaticPages:
+
+    def test_landing_page_is_prerendered(self, app, client):
+        response = client.get('/')
+
+        assert response.status_code == 200
+        assert response.data == app.extensions['static_pages']['index.landing_page']['body']
+
+    def test_static_page_not_modified(self, client):
+        etag = client.get('/blog/api').headers['ETag']
+        response = client.get('/blog/api', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
@@ -0,0 +1,124 @@
+import hashlib
+import heapq
+import threading
+import time
+from flask import current_app
+from flask_jwt_extended import JWTManager
+from .cache import LRUCache
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# JWT verification cache and revocation blocklist
+# a verified token's claims are kept, keyed by a hash of the token, until the
+# token expires (or JWT_CACHE_TTL passes), so a client sending thousands of
+# writes with the same token pays for the signature check once. The blocklist
+# is checked by flask_jwt_extended after decoding, cached or not, so a revoked
+# token is refused on its very next use.
+
+
+class TokenManager(JWTManager):
+
+    def __init__(self, app=None, cache=None, ttl=300):
+        self.token_cache = cache
+        self.ttl = ttl
+        super().__init__(app)
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        # cookie tokens carry a per-request CSRF value, those are always verified
+        if self.token_cache is None or csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        key = hashlib.sha256(encoded_token.encode()).hexdigest()
+        claims = self.token_cache.get(key)
+        if claims is not None:
+            return dict(claims)
+
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        ttl = self.ttl
+        if 'exp' in claims:
+            ttl = min(ttl, claims['exp'] - time.time())
+        if ttl > 0:
+            self.token_cache.set(key, dict(claims), ttl)
+        return claims
+
+
+class Blocklist:
+    # revoked token ids (jti), each kept until the token would have expired
+    # anyway; lookups hit the local dict first and only then the shared store.
+    # Every revoke() also drops the entries that have expired since, oldest
+    # first off a heap, so the dict holds only live revocations. (An LRU
+    # wouldn't do: evicting an entry early would make its token valid again.)
+
+    def __init__(self, redis_url=None, prefix='projectsite:revoked:'):
+        self.client = None
+        if redis_url:
+            if redis is None:
+                raise RuntimeError('JWT_BLOCKLIST_REDIS_URL is set but the redis package is not installed')
+            self.client = redis.Redis.from_url(redis_url)
+        self.prefix = prefix
+        self._revoked = {}     # jti -> expires_at
+        self._expiry = []      # heap of (expires_at, jti)
+        self._lock = threading.Lock()
+
+    def revoke(self, jti, expires_at=None):
+        expires_at = expires_at or time.time() + 86400
+        with self._lock:
+            self._purge(time.time())
+            self._revoked[jti] = expires_at
+            heapq.heappush(self._expiry, (expires_at, jti))
+        if self.client is not None:
+            self.client.set(self.prefix + jti, 1, ex=max(1, int(expires_at - time.time())))
+
+    def is_revoked(self, jti):
+        with self._lock:
+            expires_at = self._revoked.get(jti)
+            if expires_at is not None:
+                if expires_at > time.time():
+                    return True
+                del self._revoked[jti]
+
+        if self.client is not None:
+            return bool(self.client.exists(self.prefix + jti))
+        return False
+
+    def purge(self):
+        with self._lock:
+            self._purge(time.time())
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def _purge(self, now):
+        # caller holds self._lock
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, jti = heapq.heappop(self._expiry)
+            # is_revoked may have dropped it already, or it was revoked again
+            if self._revoked.get(jti) == expires_at:
+                del self._revoked[jti]
+
+
+def get_blocklist():
+    return current_app.extensions['token_blocklist']
+
+def revoke_token(claims):
+    get_blocklist().revoke(claims['jti'], claims.get('exp'))
+
+def init_app(app):
+    cache = None
+    if app.config['JWT_CACHE_ENABLED']:
+        cache = LRUCache(app.config['JWT_CACHE_MAX_ENTRIES'])
+
+    blocklist = Blocklist(app.config['JWT_BLOCKLIST_REDIS_URL'])
+    app.extensions['token_blocklist'] = blocklist
+
+    manager = TokenManager(app, cache=cache, ttl=app.config['JWT_CACHE_TTL'])
+
+    @manager.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        return blocklist.is_revoked(jwt_payload['jti'])
+
+    return manager
@@ -1,39 +1,154 @@
-from flask import Blueprint, render_template
+import base64
+import hashlib
+import json
+from flask import Blueprint, render_template, request, current_app, url_for, abort, make_response
+from .cache import cached
 from .db import get_db
+from .resources import keyset_sql
 
 indexBp = Blueprint("index", __name__)
 blogBP = Blueprint("blog", __name__, url_prefix="/blog")
 
-@indexBp.route("/")
-def landing_page():
-    return render_template("index.html")
+# table pages
+# /blog/<table> renders the first BLOG_PAGE_SIZE rows and a "load more"
+# link; /blog/<table>/rows returns the next rows as a bare <tbody> for the
+# link to append. Pages are keyset-paginated on (sort column, id), so every
+# request reads and renders at most one page however far the reader goes.
+# Without JavaScript the link opens the next page as a full page instead.
 
-@blogBP.route("/students")
-def students_page():
-    conn = get_db()
-    with conn.cursor() as cur:
-        cur.execute("SELECT * FROM students")
-        students = cur.fetchall()
 
-    return render_template("students.html", rows=students)
+class Listing:
+
+    def __init__(self, name, columns, sortable):
+        self.name = name
+        self.table = name
+        # id is selected for the cursor, it isn't shown
+        self.columns = ("id",) + tuple(columns)
+        # columns with an index (see migrations/0001), sorting on anything
+        # else would sort the whole table for every page
+        self.sortable = ("id",) + tuple(sortable)
 
-@blogBP.route("/teachers")
-def teachers_page():
-    conn = get_db()
-    with conn.cursor() as cur:
-        cur.execute("SELECT * FROM teachers")
-        teachers = cur.fetchall()
-    return render_template("teachers.html", rows=teachers)
 
-@blogBP.route("/grades")
-def grades_page():
+LISTINGS = {
+    "students": Listing("students", ("student_name", "course", "year_level", "email"),
+                        sortable=("student_name", "course", "email")),
+    "teachers": Listing("teachers", ("teacher_name", "department", "email"),
+                        sortable=("teacher_name", "department", "email")),
+    "grades": Listing("grades", ("student_name", "course_name", "grade", "semester"),
+                      sortable=("student_name", "course_name", "semester")),
+}
+
+def encode_position(value, row_id):
+    token = base64.urlsafe_b64encode(json.dumps([value, row_id]).encode())
+    return token.decode().rstrip("=")
+
+def decode_position(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        # both end up bound into the keyset WHERE
+        if isinstance(row_id, bool) or not isinstance(row_id, int):
+            raise ValueError
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError
+        return value, row_id
+    except (ValueError, TypeError):
+        abort(400, "invalid cursor")
+
+def get_sort_args(listing):
+    sort = request.args.get("sort", "id")
+    order = request.args.get("order", "asc").lower()
+    if sort not in listing.sortable or order not in ("asc", "desc"):
+        abort(400, f"sort must be one of: {', '.join(listing.sortable)}; order asc or desc")
+    return sort, order
+
+def fetch_page(listing):
+    sort, order = get_sort_args(listing)
+    after = request.args.get("after")
+    position = decode_position(after) if after else None
+    limit = current_app.config["BLOG_PAGE_SIZE"]
+
+    params = []
+    if position:
+        params += [position[1]] if sort == "id" else list(position)
+    params.append(limit + 1)
+
     conn = get_db()
     with conn.cursor() as cur:
-        cur.execute("SELECT * FROM grades")
-        grades = cur.fetchall()
+        cur.execute(keyset_sql(listing.table, listing.columns, sort, order == "desc", bool(position)), params)
+        rows = list(cur.fetchall())
+
+    page = {"rows": rows[:limit], "sort": sort, "order": order, "sortable": listing.sortable,
+            "next_page": None, "next_rows": None}
 
-    return render_template("grades.html", rows=grades)
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        cursor = encode_position(last[sort], last["id"])
+        page["next_page"] = url_for(f"blog.{listing.name}_page", sort=sort, order=order, after=cursor)
+        page["next_rows"] = url_for(f"blog.{listing.name}_rows", sort=sort, order=order, after=cursor)
+    return page
+
+def add_listing_routes(bp, listing):
+    name = listing.name
+
+    # pages and fragments are cached per sort/cursor and dropped by any API
+    # write to the table, like the API's own GET responses
+    @cached(listing.table)
+    def page():
+        return render_template(f"{name}.html", **fetch_page(listing))
+
+    @cached(listing.table)
+    def rows():
+        return render_template(f"{name}_rows.html", **fetch_page(listing))
+
+    bp.add_url_rule(f"/{name}", f"{name}_page", page)
+    bp.add_url_rule(f"/{name}/rows", f"{name}_rows", rows)
+
+# static pages
+# pages that read nothing from the database are rendered once at startup
+# and served as stored bytes with an ETag; with template reloading on (debug)
+# they are rendered on every request as usual
+
+STATIC_PAGES = {
+    "index.landing_page": "index.html",
+    "blog.api_page": "api.html",
+}
+
+def render_static_page():
+    page = current_app.extensions.get("static_pages", {}).get(request.endpoint)
+    if page is None:
+        return render_template(STATIC_PAGES[request.endpoint])
+
+    response = make_response(page["body"])
+    # weak, like the cached() pages: the compressed variants carry it too
+    response.set_etag(page["etag"], weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+@indexBp.route("/")
+def landing_page():
+    return render_static_page()
+
+for listing in LISTINGS.values():
+    add_listing_routes(blogBP, listing)
 
 @blogBP.route("/api")
 def api_page():
-    return render_template("api.html")
\ No newline at end of file
+    return render_static_page()
+
+def prerender(app):
+    pages = {}
+    for endpoint, template in STATIC_PAGES.items():
+        with app.test_request_context():
+            path = url_for(endpoint)
+        # a request context for the page's own URL, base.html highlights the
+        # nav link of request.endpoint
+        with app.test_request_context(path):
+            body = render_template(template).encode()
+        pages[endpoint] = {"body": body, "etag": hashlib.sha1(body).hexdigest()}
+    return pages
+
+def init_app(app):
+    # after the blueprints are registered, the pages link to all of them
+    if not (app.debug or app.config["TEMPLATES_AUTO_RELOAD"]):
+        app.extensions["static_pages"] = prerender(app)